@@ -2,18 +2,35 @@
 Memory Agent - Manages episodic and semantic memory
 Uses PostgreSQL + FAISS for hybrid storage
 """
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
+import asyncio
+import hashlib
 import logging
+import time
 from datetime import datetime
+import faiss
+from cachetools import TTLCache
+from prometheus_client import Counter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm.attributes import set_committed_value
 
+from backend.config import settings
+from backend.database import AsyncSessionLocal
 from backend.models.agent import AgentMemory
 from backend.ml.embeddings import embedding_service
 from backend.utils.security import encryption_service
 
 logger = logging.getLogger(__name__)
 
+# Cache stats for tuning (exposed via /metrics)
+search_cache_hits = Counter(
+    "memory_search_cache_hits_total", "Memory search cache hits"
+)
+search_cache_misses = Counter(
+    "memory_search_cache_misses_total", "Memory search cache misses"
+)
+
 
 class MemoryAgent:
     """
@@ -23,6 +40,89 @@ class MemoryAgent:
 
     def __init__(self):
         self.name = "memory_agent"
+        # Batch embedding writes: amortizes model forward passes and FAISS
+        # index updates across memories. Set False to embed inline (tests).
+        self.batch_embeddings = True
+        self.max_batch = 32
+        self.max_wait_seconds = 0.05
+        self._embed_queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # Cache raw search results for hot queries: skips the embedding
+        # model forward pass and ANN search on repeated requests
+        self._search_cache = TTLCache(maxsize=2048, ttl=300)
+        self._search_cache_lock = asyncio.Lock()
+        # Semantic cache: near-duplicate queries (cosine >= threshold)
+        # reuse the cached memory IDs without running full ANN search
+        self.semantic_cache_threshold = 0.95
+        self.semantic_cache_ttl = 300
+        self.semantic_cache_maxsize = 1024
+        self._query_cache_index: Optional[faiss.IndexFlatIP] = None
+        self._query_cache_entries: List[Tuple[List[str], float]] = []
+
+    async def start_embedding_worker(self):
+        """Start background task that flushes queued embeddings in batches"""
+        if self._flush_task is None:
+            self._embed_queue = asyncio.Queue()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            logger.info("Embedding batch worker started")
+
+    async def stop_embedding_worker(self):
+        """Stop the background task and flush anything still queued"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        if self._embed_queue and not self._embed_queue.empty():
+            batch = []
+            while not self._embed_queue.empty():
+                batch.append(self._embed_queue.get_nowait())
+            await self._flush_batch(batch)
+
+    async def _flush_loop(self):
+        """Drain the queue, flushing every max_batch items or max_wait_seconds"""
+        while True:
+            batch = [await self._embed_queue.get()]
+
+            # Collect more items until the batch is full or the wait expires
+            while len(batch) < self.max_batch:
+                try:
+                    item = await asyncio.wait_for(
+                        self._embed_queue.get(),
+                        timeout=self.max_wait_seconds
+                    )
+                    batch.append(item)
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush_batch(batch)
+            except Exception as e:
+                logger.error(f"Error flushing embedding batch: {e}")
+
+    async def _flush_batch(self, batch: List[Tuple[str, dict]]):
+        """Embed a batch of memories and mark them as stored"""
+        contents = [content for content, _ in batch]
+        metadata = [meta for _, meta in batch]
+
+        # Off the event loop: the forward pass runs on the ML executor
+        await embedding_service.aadd_documents(documents=contents, metadata=metadata)
+
+        # Mark the flushed memories as stored in FAISS
+        memory_ids = [meta["memory_id"] for meta in metadata]
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(AgentMemory)
+                .where(AgentMemory.id.in_(memory_ids))
+                .values(embedding_stored="faiss")
+            )
+            await db.commit()
+
+        logger.info(f"Flushed {len(batch)} embeddings to FAISS")
 
     async def store_memory(
         self,
@@ -38,16 +138,19 @@ class MemoryAgent:
         """
         Store a memory with optional encryption and embedding
         """
-        # Encrypt if requested
+        # Encrypt if requested (plus a short preview for listing endpoints)
         content_encrypted = None
+        content_preview_encrypted = None
         if encrypt:
             content_encrypted = encryption_service.encrypt(content)
+            content_preview_encrypted = encryption_service.encrypt(content[:128])
 
         # Create memory record
         memory = AgentMemory(
             memory_type=memory_type,
             content=content,
             content_encrypted=content_encrypted,
+            content_preview_encrypted=content_preview_encrypted,
             agent_type=agent_type,
             related_run_id=related_run_id,
             tags=tags or [],
@@ -58,19 +161,34 @@ class MemoryAgent:
         await db.flush()
 
         # Add to FAISS for semantic search
-        try:
-            embedding_service.add_documents(
-                documents=[content],
-                metadata=[{
-                    "memory_id": str(memory.id),
-                    "memory_type": memory_type,
-                    "agent_type": agent_type,
-                    "importance": importance_score
-                }]
-            )
-            memory.embedding_stored = "faiss"
-        except Exception as e:
-            logger.error(f"Error storing embedding: {e}")
+        embed_metadata = {
+            "memory_id": str(memory.id),
+            "memory_type": memory_type,
+            "agent_type": agent_type,
+            "importance": importance_score
+        }
+
+        if settings.MEMORY_VECTOR_BACKEND == "pgvector":
+            # Embedding lives in the same row, committed transactionally;
+            # the forward pass runs on the ML executor, not the loop
+            try:
+                memory.embedding = (await embedding_service.aencode([content]))[0]
+                memory.embedding_stored = "pgvector"
+            except Exception as e:
+                logger.error(f"Error embedding memory: {e}")
+        elif self.batch_embeddings and self._embed_queue is not None:
+            # Enqueue for the batch worker; marked "faiss" after the flush
+            await self._embed_queue.put((content, embed_metadata))
+            memory.embedding_stored = "pending"
+        else:
+            try:
+                embedding_service.add_documents(
+                    documents=[content],
+                    metadata=[embed_metadata]
+                )
+                memory.embedding_stored = "faiss"
+            except Exception as e:
+                logger.error(f"Error storing embedding: {e}")
 
         await db.commit()
         await db.refresh(memory)
@@ -85,20 +203,76 @@ class MemoryAgent:
         query: str,
         memory_type: Optional[str] = None,
         agent_type: Optional[str] = None,
-        top_k: int = 5
+        top_k: int = 5,
+        no_cache: bool = False
     ) -> List[AgentMemory]:
         """
         Retrieve relevant memories using semantic search
+        Set no_cache=True to bypass both cache layers
         """
-        # Semantic search with FAISS
-        try:
-            search_results = embedding_service.search(query, top_k=top_k * 2)
-        except Exception as e:
-            logger.error(f"Error searching embeddings: {e}")
-            search_results = []
+        if settings.MEMORY_VECTOR_BACKEND == "pgvector":
+            return await self._retrieve_memories_pgvector(
+                db, query, memory_type, agent_type, top_k
+            )
+
+        # Check the in-process cache before hitting the embedding model
+        cache_key = (
+            hashlib.blake2b(query.strip().lower().encode()).digest(),
+            top_k * 2
+        )
+
+        search_results = None
+        if not no_cache:
+            async with self._search_cache_lock:
+                search_results = self._search_cache.get(cache_key)
+
+        memory_ids = None
+        query_embedding = None
+        search_failed = False
+
+        if search_results is not None:
+            search_cache_hits.inc()
+        else:
+            # Semantic cache: embed once and look for a near-duplicate
+            # query; the forward pass runs on the ML executor
+            if not no_cache:
+                try:
+                    query_embedding = await embedding_service.aencode([query])
+                    memory_ids = self._semantic_cache_lookup(query_embedding)
+                except Exception as e:
+                    logger.error(f"Error checking semantic cache: {e}")
+
+            if memory_ids is not None:
+                search_cache_hits.inc()
+            else:
+                search_cache_misses.inc()
+
+                # Semantic search with FAISS, off the event loop (with
+                # no_cache the embedding is still None and search()
+                # encodes it - also on the executor thread)
+                try:
+                    search_results = await embedding_service.asearch(
+                        query,
+                        top_k=top_k * 2,
+                        query_embedding=query_embedding
+                    )
+                except Exception as e:
+                    logger.error(f"Error searching embeddings: {e}")
+                    search_results = []
+                    search_failed = True
+
+                # Only successful searches are cached: a transient
+                # failure must not pin an empty result for the TTL
+                if not no_cache and not search_failed:
+                    async with self._search_cache_lock:
+                        self._search_cache[cache_key] = search_results
 
         # Get memory IDs from search results
-        memory_ids = [result[2].get("memory_id") for result in search_results if result[2].get("memory_id")]
+        if memory_ids is None:
+            memory_ids = [result[2].get("memory_id") for result in search_results if result[2].get("memory_id")]
+
+            if query_embedding is not None and not no_cache and not search_failed:
+                self._semantic_cache_insert(query_embedding, memory_ids)
 
         if not memory_ids:
             return []
@@ -114,17 +288,118 @@ class MemoryAgent:
         result = await db.execute(stmt)
         memories = result.scalars().all()
 
-        # Update access count
-        for memory in memories:
-            memory.access_count += 1
-            memory.last_accessed = datetime.utcnow()
+        # Restore FAISS similarity ordering: the IN (...) fetch returns rows
+        # in arbitrary order, which would let [:top_k] drop the best matches
+        order = {memory_id: i for i, memory_id in enumerate(memory_ids)}
+        memories = sorted(memories, key=lambda m: order.get(str(m.id), len(order)))
 
-        await db.commit()
+        await self._touch_memories(db, memories)
 
         logger.info(f"Retrieved {len(memories)} memories for query: {query[:50]}")
 
         return memories[:top_k]
 
+    async def _retrieve_memories_pgvector(
+        self,
+        db: AsyncSession,
+        query: str,
+        memory_type: Optional[str],
+        agent_type: Optional[str],
+        top_k: int
+    ) -> List[AgentMemory]:
+        """
+        Single-query retrieval via pgvector: ANN ordering and filters
+        run in Postgres, replacing the FAISS search + IN (...) fetch pair
+        """
+        try:
+            query_embedding = (await embedding_service.aencode([query]))[0]
+        except Exception as e:
+            logger.error(f"Error encoding query: {e}")
+            return []
+
+        stmt = (
+            select(AgentMemory)
+            .where(AgentMemory.embedding.isnot(None))
+            .order_by(AgentMemory.embedding.cosine_distance(query_embedding))
+            .limit(top_k)
+        )
+
+        if memory_type:
+            stmt = stmt.where(AgentMemory.memory_type == memory_type)
+        if agent_type:
+            stmt = stmt.where(AgentMemory.agent_type == agent_type)
+
+        result = await db.execute(stmt)
+        memories = result.scalars().all()
+
+        await self._touch_memories(db, memories)
+
+        logger.info(f"Retrieved {len(memories)} memories for query: {query[:50]}")
+
+        return memories
+
+    async def _touch_memories(self, db: AsyncSession, memories: List[AgentMemory]):
+        """Bump access counts for fetched memories with one batched UPDATE"""
+        if not memories:
+            return
+
+        # Atomic server-side increment: no read-modify-write race under
+        # concurrent retrievals, and the timestamp comes from the server
+        await db.execute(
+            update(AgentMemory)
+            .where(AgentMemory.id.in_([memory.id for memory in memories]))
+            .values(
+                access_count=AgentMemory.access_count + 1,
+                last_accessed=func.now()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        # Mirror for the response payload only: set_committed_value does
+        # not dirty the objects, so no second UPDATE is emitted later
+        now = datetime.utcnow()
+        for memory in memories:
+            set_committed_value(memory, "access_count", (memory.access_count or 0) + 1)
+            set_committed_value(memory, "last_accessed", now)
+
+    def _semantic_cache_lookup(self, query_embedding) -> Optional[List[str]]:
+        """Return cached memory IDs if a near-duplicate query is cached"""
+        if self._query_cache_index is None or self._query_cache_index.ntotal == 0:
+            return None
+
+        normalized = query_embedding.astype('float32').copy()
+        faiss.normalize_L2(normalized)
+
+        scores, indices = self._query_cache_index.search(normalized, 1)
+        idx = int(indices[0][0])
+        score = float(scores[0][0])
+
+        if idx < 0 or score < self.semantic_cache_threshold:
+            return None
+
+        cached_ids, cached_at = self._query_cache_entries[idx]
+        if time.monotonic() - cached_at > self.semantic_cache_ttl:
+            return None
+
+        return cached_ids
+
+    def _semantic_cache_insert(self, query_embedding, memory_ids: List[str]):
+        """Cache a query embedding and its resolved memory IDs"""
+        normalized = query_embedding.astype('float32').copy()
+        faiss.normalize_L2(normalized)
+
+        if self._query_cache_index is None:
+            self._query_cache_index = faiss.IndexFlatIP(normalized.shape[1])
+
+        # Flat index does not support removal; reset when full
+        if self._query_cache_index.ntotal >= self.semantic_cache_maxsize:
+            self._query_cache_index.reset()
+            self._query_cache_entries = []
+
+        self._query_cache_index.add(normalized)
+        self._query_cache_entries.append((memory_ids, time.monotonic()))
+
     async def get_recent_memories(
         self,
         db: AsyncSession,
@@ -169,6 +444,44 @@ class MemoryAgent:
 
         return memories
 
+    async def decrypt_memories(
+        self,
+        memories: List[AgentMemory],
+        preview: bool = False
+    ) -> List[str]:
+        """
+        Decrypt a batch of memories off the event loop
+        Fernet decryption is CPU-bound C code; one to_thread hop for the
+        whole batch keeps the event loop free and amortizes the handoff
+        With preview=True only the short encrypted preview is decrypted,
+        falling back to the full blob for rows written before previews
+        """
+        contents = [memory.content for memory in memories]
+
+        def _ciphertext(memory: AgentMemory) -> Optional[str]:
+            if preview and memory.content_preview_encrypted:
+                return memory.content_preview_encrypted
+            return memory.content_encrypted
+
+        encrypted = [
+            (i, _ciphertext(memory))
+            for i, memory in enumerate(memories)
+            if _ciphertext(memory)
+        ]
+
+        if encrypted:
+            decrypted = await asyncio.to_thread(
+                encryption_service.decrypt_many,
+                [ciphertext for _, ciphertext in encrypted]
+            )
+            for (i, _), plaintext in zip(encrypted, decrypted):
+                if plaintext is not None:
+                    contents[i] = plaintext
+                else:
+                    logger.error(f"Error decrypting memory: {memories[i].id}")
+
+        return contents
+
     def decrypt_memory(self, memory: AgentMemory) -> str:
         """
         Decrypt memory content if encrypted
@@ -195,23 +508,30 @@ class MemoryAgent:
 
         cutoff_date = datetime.utcnow() - timedelta(days=max_age_days)
 
-        # Find memories to prune
-        stmt = select(AgentMemory).where(
-            (AgentMemory.created_at < cutoff_date) &
-            (AgentMemory.importance_score < min_importance) &
-            (AgentMemory.access_count < min_access_count)
+        # Single bulk DELETE instead of one round-trip per memory
+        stmt = (
+            delete(AgentMemory)
+            .where(
+                (AgentMemory.created_at < cutoff_date) &
+                (AgentMemory.importance_score < min_importance) &
+                (AgentMemory.access_count < min_access_count)
+            )
+            .returning(AgentMemory.id)
         )
 
         result = await db.execute(stmt)
-        memories_to_prune = result.scalars().all()
-
-        # Delete memories
-        for memory in memories_to_prune:
-            await db.delete(memory)
+        pruned_ids = [str(memory_id) for memory_id in result.scalars().all()]
 
         await db.commit()
 
-        logger.info(f"Pruned {len(memories_to_prune)} memories")
+        # Drop the pruned memories from FAISS as well
+        if pruned_ids:
+            try:
+                embedding_service.remove(pruned_ids)
+            except Exception as e:
+                logger.error(f"Error removing pruned embeddings: {e}")
+
+        logger.info(f"Pruned {len(pruned_ids)} memories")
 
 
 # Global singleton
@@ -6,7 +6,7 @@ from typing import Dict, Any, List, Optional
 import logging
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_, lambda_stmt
 import asyncio
 import uuid
 
@@ -38,10 +38,13 @@ class MetaAgent:
         task_description: str,
         input_data: Dict[str, Any],
         parent_run_id: Optional[str] = None,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        commit: bool = True
     ) -> AgentRun:
         """
         Start a new agent run
+        Pass commit=False to only flush, letting the caller group
+        several runs into one transaction
         """
         run = AgentRun(
             agent_type=agent_type,
@@ -54,8 +57,12 @@ class MetaAgent:
         )
 
         db.add(run)
-        await db.commit()
-        await db.refresh(run)
+
+        if commit:
+            await db.commit()
+            await db.refresh(run)
+        else:
+            await db.flush()
 
         logger.info(f"Started {agent_type} run: {run.id}")
 
@@ -67,10 +74,12 @@ class MetaAgent:
         run: AgentRun,
         output_data: Dict[str, Any],
         status: str = "success",
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        commit: bool = True
     ):
         """
         Complete an agent run
+        Pass commit=False to defer the commit to the caller
         """
         run.status = status
         run.output_data = output_data
@@ -78,7 +87,10 @@ class MetaAgent:
         run.completed_at = datetime.utcnow()
         run.duration_seconds = (run.completed_at - run.started_at).total_seconds()
 
-        await db.commit()
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
 
         logger.info(f"Completed {run.agent_type} run: {run.id} - {status}")
 
@@ -101,7 +113,8 @@ class MetaAgent:
             agent_type="meta",
             task_description=f"Provider lookup for NPI {npi_number}",
             input_data={"npi_number": npi_number},
-            user_id=user_id
+            user_id=user_id,
+            commit=False
         )
 
         try:
@@ -112,10 +125,29 @@ class MetaAgent:
                 task_description=f"Fetch NPI data for {npi_number}",
                 input_data={"npi_number": npi_number},
                 parent_run_id=str(run.id),
-                user_id=user_id
+                user_id=user_id,
+                commit=False
             )
 
-            npi_data = await npi_client.lookup_npi(npi_number)
+            # Overlap the NPI fetch (pure HTTP) with a prior-memory probe:
+            # both are I/O bound, so wall-clock is max() instead of sum()
+            npi_data, prior_memories = await asyncio.gather(
+                npi_client.lookup_npi(npi_number),
+                memory_agent.retrieve_memories(
+                    db=db,
+                    query=f"Provider {npi_number}",
+                    agent_type="meta",
+                    top_k=1
+                ),
+                return_exceptions=True
+            )
+
+            if isinstance(prior_memories, Exception):
+                logger.warning(f"Prior-memory lookup failed: {prior_memories}")
+                prior_memories = []
+
+            if isinstance(npi_data, Exception):
+                raise npi_data
 
             if not npi_data:
                 await self.complete_run(
@@ -123,7 +155,8 @@ class MetaAgent:
                     run=npi_run,
                     output_data={},
                     status="failed",
-                    error_message="NPI not found"
+                    error_message="NPI not found",
+                    commit=False
                 )
                 await self.complete_run(
                     db=db,
@@ -139,7 +172,8 @@ class MetaAgent:
             await self.complete_run(
                 db=db,
                 run=npi_run,
-                output_data=parsed_data
+                output_data=parsed_data,
+                commit=False
             )
 
             # Step 2: Geocode address
@@ -154,20 +188,47 @@ class MetaAgent:
                     "postal_code": parsed_data.get("postal_code")
                 },
                 parent_run_id=str(run.id),
-                user_id=user_id
+                user_id=user_id,
+                commit=False
             )
 
-            coords = None
+            # Steps 2+3 run concurrently: geocoding is pure HTTP while the
+            # memory write only touches the DB. Skip the memory write when
+            # the prior-memory probe already found one for this provider.
+            memory_text = f"Provider {npi_number}: {parsed_data.get('first_name', '')} {parsed_data.get('last_name', '')} {parsed_data.get('organization_name', '')} in {parsed_data.get('city', '')}, {parsed_data.get('state', '')}"
+
+            gather_targets = []
+
             if parsed_data.get("address_line_1"):
-                try:
-                    coords = await geocoder.geocode(
-                        address=parsed_data.get("address_line_1"),
-                        city=parsed_data.get("city"),
-                        state=parsed_data.get("state"),
-                        postal_code=parsed_data.get("postal_code")
-                    )
-                except Exception as e:
-                    logger.warning(f"Geocoding failed: {e}")
+                gather_targets.append(("geocode", geocoder.geocode(
+                    address=parsed_data.get("address_line_1"),
+                    city=parsed_data.get("city"),
+                    state=parsed_data.get("state"),
+                    postal_code=parsed_data.get("postal_code")
+                )))
+
+            if not prior_memories:
+                gather_targets.append(("memory", memory_agent.store_memory(
+                    db=db,
+                    content=memory_text,
+                    memory_type="episodic",
+                    agent_type="meta",
+                    related_run_id=str(run.id),
+                    tags=["provider", "npi_lookup", npi_number],
+                    importance_score=0.7
+                )))
+
+            coords = None
+            if gather_targets:
+                results = await asyncio.gather(
+                    *[coro for _, coro in gather_targets],
+                    return_exceptions=True
+                )
+                for (label, _), value in zip(gather_targets, results):
+                    if isinstance(value, Exception):
+                        logger.warning(f"{label} step failed: {value}")
+                    elif label == "geocode":
+                        coords = value
 
             geocode_output = {}
             if coords:
@@ -178,20 +239,8 @@ class MetaAgent:
             await self.complete_run(
                 db=db,
                 run=geocode_run,
-                output_data=geocode_output
-            )
-
-            # Step 3: Store in memory
-            memory_text = f"Provider {npi_number}: {parsed_data.get('first_name', '')} {parsed_data.get('last_name', '')} {parsed_data.get('organization_name', '')} in {parsed_data.get('city', '')}, {parsed_data.get('state', '')}"
-
-            await memory_agent.store_memory(
-                db=db,
-                content=memory_text,
-                memory_type="episodic",
-                agent_type="meta",
-                related_run_id=str(run.id),
-                tags=["provider", "npi_lookup", npi_number],
-                importance_score=0.7
+                output_data=geocode_output,
+                commit=False
             )
 
             # Complete meta run
@@ -229,20 +278,21 @@ class MetaAgent:
         """
         Get full run hierarchy (parent and all children)
         """
-        # Get main run
+        # Fetch parent and children in a single round-trip; lambda_stmt
+        # caches the compiled expression across calls
         result = await db.execute(
-            select(AgentRun).where(AgentRun.id == run_id)
+            lambda_stmt(lambda: select(AgentRun).where(
+                or_(AgentRun.id == run_id, AgentRun.parent_run_id == run_id)
+            ))
         )
-        run = result.scalar_one_or_none()
+        rows = result.scalars().all()
+
+        run = next((r for r in rows if str(r.id) == str(run_id)), None)
 
         if not run:
             return None
 
-        # Get child runs
-        result = await db.execute(
-            select(AgentRun).where(AgentRun.parent_run_id == run_id)
-        )
-        children = result.scalars().all()
+        children = [r for r in rows if r.parent_run_id == run_id]
 
         return {
             "run": {
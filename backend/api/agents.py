@@ -1,11 +1,17 @@
 """Agent API endpoints"""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
-from typing import Optional
+from sqlalchemy import select
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from typing import List, Optional
+from uuid import UUID
+from datetime import datetime
+import json
 
 from backend.database import get_db
 from backend.models.user import User
+from backend.models.agent import AgentRun
 from backend.api.auth import get_current_user
 from backend.agents.meta_agent import meta_agent
 from backend.agents.memory_agent import memory_agent
@@ -30,6 +36,33 @@ class MemorySearchRequest(BaseModel):
     top_k: int = 5
 
 
+class MemoryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    content: str
+    memory_type: str
+    agent_type: str
+    importance_score: float
+    access_count: int
+    created_at: datetime
+
+
+class RecentMemoryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    content: str
+    memory_type: str
+    created_at: datetime
+
+
+# TypeAdapters serialize whole lists in one C-speed dump_json call
+# (datetimes and UUIDs included), instead of per-row dict building
+memory_list_adapter = TypeAdapter(List[MemoryOut])
+recent_memory_list_adapter = TypeAdapter(List[RecentMemoryOut])
+
+
 @router.post("/execute/provider-lookup")
 async def execute_provider_lookup(
     request: ExecuteTaskRequest,
@@ -46,6 +79,41 @@ async def execute_provider_lookup(
     return result
 
 
+@router.get("/runs/stream")
+async def stream_runs(
+    status: Optional[str] = None,
+    agent_type: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream agent runs as NDJSON
+    Uses a server-side cursor so large histories are never fully
+    materialized in memory; rows are emitted as they arrive
+    """
+    stmt = select(AgentRun).order_by(AgentRun.created_at.desc())
+
+    if status:
+        stmt = stmt.where(AgentRun.status == status)
+    if agent_type:
+        stmt = stmt.where(AgentRun.agent_type == agent_type)
+
+    async def generate():
+        result = await db.stream_scalars(stmt)
+        async for run in result:
+            yield json.dumps({
+                "id": str(run.id),
+                "agent_type": run.agent_type,
+                "status": run.status,
+                "task_description": run.task_description,
+                "duration_seconds": run.duration_seconds,
+                "started_at": run.started_at.isoformat() if run.started_at else None,
+                "completed_at": run.completed_at.isoformat() if run.completed_at else None
+            }) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.get("/run/{run_id}")
 async def get_run_details(
     run_id: str,
@@ -97,19 +165,26 @@ async def search_memories(
         top_k=request.top_k
     )
 
-    return [
-        {
-            "id": str(m.id),
-            "content": memory_agent.decrypt_memory(m),
-            "memory_type": m.memory_type,
-            "agent_type": m.agent_type,
-            "importance_score": m.importance_score,
-            "access_count": m.access_count,
-            "created_at": m.created_at.isoformat()
-        }
-        for m in memories
+    contents = await memory_agent.decrypt_memories(memories)
+
+    payload = [
+        MemoryOut(
+            id=m.id,
+            content=content,
+            memory_type=m.memory_type,
+            agent_type=m.agent_type,
+            importance_score=m.importance_score,
+            access_count=m.access_count,
+            created_at=m.created_at
+        )
+        for m, content in zip(memories, contents)
     ]
 
+    return Response(
+        memory_list_adapter.dump_json(payload),
+        media_type="application/json"
+    )
+
 
 @router.get("/memory/recent")
 async def get_recent_memories(
@@ -120,12 +195,19 @@ async def get_recent_memories(
     """Get recent memories"""
     memories = await memory_agent.get_recent_memories(db=db, limit=limit)
 
-    return [
-        {
-            "id": str(m.id),
-            "content": memory_agent.decrypt_memory(m)[:100] + "...",
-            "memory_type": m.memory_type,
-            "created_at": m.created_at.isoformat()
-        }
-        for m in memories
+    contents = await memory_agent.decrypt_memories(memories, preview=True)
+
+    payload = [
+        RecentMemoryOut(
+            id=m.id,
+            content=content[:100] + "...",
+            memory_type=m.memory_type,
+            created_at=m.created_at
+        )
+        for m, content in zip(memories, contents)
     ]
+
+    return Response(
+        recent_memory_list_adapter.dump_json(payload),
+        media_type="application/json"
+    )
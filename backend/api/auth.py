@@ -2,28 +2,39 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, lambda_stmt
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import timedelta
+from cachetools import TTLCache
 
 from backend.database import get_db
 from backend.models.user import User
 from backend.utils.security import (
-    verify_password,
-    get_password_hash,
+    averify_password,
+    aget_password_hash,
+    password_needs_rehash,
     create_access_token,
     decode_access_token,
     generate_totp_secret,
     verify_totp,
     get_totp_uri,
     generate_qr_code,
+    QR_MEDIA_TYPE,
 )
 from backend.config import settings
 
 router = APIRouter()
 security = HTTPBearer()
 
+# Short-TTL auth cache: raw token -> User row. Skips the JWT decode and
+# user SELECT on every authenticated request within the window; entries
+# are popped explicitly when the user record changes (e.g. 2FA setup).
+# A cache hit hands back an instance detached from the current request's
+# session, so it is read-only: endpoints that mutate the user must
+# re-SELECT it through their own session first.
+AUTH_CACHE = TTLCache(maxsize=10_000, ttl=60)
+
 
 # Pydantic schemas
 class UserRegister(BaseModel):
@@ -48,6 +59,7 @@ class TokenResponse(BaseModel):
 class Enable2FAResponse(BaseModel):
     secret: str
     qr_code: str
+    qr_media_type: str = QR_MEDIA_TYPE
     uri: str
 
 
@@ -62,6 +74,11 @@ async def get_current_user(
 ) -> User:
     """Get current authenticated user from JWT token"""
     token = credentials.credentials
+
+    cached_user = AUTH_CACHE.get(token)
+    if cached_user is not None:
+        return cached_user
+
     payload = decode_access_token(token)
 
     if not payload:
@@ -77,7 +94,10 @@ async def get_current_user(
             detail="Invalid token payload"
         )
 
-    result = await db.execute(select(User).where(User.id == user_id))
+    # lambda statement: the expression tree is built and cached once,
+    # later calls only swap in the bound user_id
+    stmt = lambda_stmt(lambda: select(User).where(User.id == user_id))
+    result = await db.execute(stmt)
     user = result.scalar_one_or_none()
 
     if not user or not user.is_active:
@@ -86,6 +106,8 @@ async def get_current_user(
             detail="User not found or inactive"
         )
 
+    AUTH_CACHE[token] = user
+
     return user
 
 
@@ -110,7 +132,7 @@ async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await aget_password_hash(user_data.password),
         is_active=True,
         is_verified=True,
     )
@@ -140,7 +162,7 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     )
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await averify_password(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
@@ -160,6 +182,11 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
                 detail="Invalid TOTP token"
             )
 
+    # Upgrade legacy bcrypt hashes (or stale argon2 params) on login
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await aget_password_hash(credentials.password)
+        await db.commit()
+
     # Create token
     access_token = create_access_token(
         data={"sub": str(user.id), "username": user.username}
@@ -174,11 +201,16 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
 
 @router.post("/2fa/enable", response_model=Enable2FAResponse)
 async def enable_2fa(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Enable TOTP 2FA for current user"""
-    if current_user.totp_enabled:
+    # current_user may be a cache hit detached from this session; load
+    # the row here so the write below is actually tracked and flushed
+    user = await db.get(User, current_user.id)
+
+    if user.totp_enabled:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="2FA already enabled"
@@ -186,13 +218,16 @@ async def enable_2fa(
 
     # Generate secret
     secret = generate_totp_secret()
-    uri = get_totp_uri(secret, current_user.username)
+    uri = get_totp_uri(secret, user.username)
     qr_code = generate_qr_code(uri)
 
     # Save secret (not enabled yet until verified)
-    current_user.totp_secret = secret
+    user.totp_secret = secret
     await db.commit()
 
+    # Drop the cached user so the updated record is re-read
+    AUTH_CACHE.pop(credentials.credentials, None)
+
     return Enable2FAResponse(
         secret=secret,
         qr_code=qr_code,
@@ -203,26 +238,34 @@ async def enable_2fa(
 @router.post("/2fa/verify")
 async def verify_2fa_enable(
     verify_data: Verify2FA,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Verify TOTP token and enable 2FA"""
-    if not current_user.totp_secret:
+    # current_user may be a cache hit detached from this session; load
+    # the row here so the write below is actually tracked and flushed
+    user = await db.get(User, current_user.id)
+
+    if not user.totp_secret:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="2FA not initialized. Call /2fa/enable first"
         )
 
-    if not verify_totp(current_user.totp_secret, verify_data.totp_token):
+    if not verify_totp(user.totp_secret, verify_data.totp_token):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid TOTP token"
         )
 
     # Enable 2FA
-    current_user.totp_enabled = True
+    user.totp_enabled = True
     await db.commit()
 
+    # Drop the cached user so the updated record is re-read
+    AUTH_CACHE.pop(credentials.credentials, None)
+
     return {"message": "2FA enabled successfully"}
 
 
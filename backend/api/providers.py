@@ -1,13 +1,14 @@
 """Provider API endpoints"""
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from pydantic import BaseModel
 from typing import Optional, List
-import json
+import orjson
 
+from backend.config import settings
 from backend.database import get_db
-from backend.models.provider import Provider, ProviderTrustScore
+from backend.models.provider import Provider, ProviderTrustScore, geography_point
 from backend.models.user import User
 from backend.api.auth import get_current_user
 from backend.integrations.npi import npi_client
@@ -124,7 +125,8 @@ async def lookup_and_store_provider(
         parsed["longitude"] = coords[1]
 
     # Compute integrity hash
-    raw_json = json.dumps(parsed["raw_data"], sort_keys=True)
+    # orjson canonicalizes in C and hands bytes straight to the hash
+    raw_json = orjson.dumps(parsed["raw_data"], option=orjson.OPT_SORT_KEYS)
     integrity_hash = compute_integrity_hash(raw_json)
 
     # Create provider
@@ -149,6 +151,9 @@ async def lookup_and_store_provider(
         integrity_hash=integrity_hash
     )
 
+    if settings.POSTGIS_ENABLED and coords:
+        provider.geom = geography_point(coords[0], coords[1])
+
     db.add(provider)
     await db.commit()
     await db.refresh(provider)
@@ -178,19 +183,32 @@ async def search_providers_by_location(
     current_user: User = Depends(get_current_user)
 ):
     """Search providers near location"""
-    # Simple bounding box search
-    # For production, use PostGIS or more sophisticated geo queries
-    lat_delta = radius_km / 111.0  # rough km to degree
-    lon_delta = radius_km / (111.0 * abs(latitude / 90.0 + 0.1))
-
-    result = await db.execute(
-        select(Provider).where(
-            (Provider.latitude >= latitude - lat_delta) &
-            (Provider.latitude <= latitude + lat_delta) &
-            (Provider.longitude >= longitude - lon_delta) &
-            (Provider.longitude <= longitude + lon_delta)
-        ).limit(limit)
-    )
+    if settings.POSTGIS_ENABLED:
+        # Exact radius, GiST-index-backed - no full-table scan
+        result = await db.execute(
+            select(Provider).where(
+                func.ST_DWithin(
+                    Provider.geom,
+                    func.ST_SetSRID(
+                        func.ST_MakePoint(longitude, latitude), 4326
+                    ).cast(Provider.geom.type),
+                    radius_km * 1000
+                )
+            ).limit(limit)
+        )
+    else:
+        # Simple bounding box search fallback without PostGIS
+        lat_delta = radius_km / 111.0  # rough km to degree
+        lon_delta = radius_km / (111.0 * abs(latitude / 90.0 + 0.1))
+
+        result = await db.execute(
+            select(Provider).where(
+                (Provider.latitude >= latitude - lat_delta) &
+                (Provider.latitude <= latitude + lat_delta) &
+                (Provider.longitude >= longitude - lon_delta) &
+                (Provider.longitude <= longitude + lon_delta)
+            ).limit(limit)
+        )
 
     providers = result.scalars().all()
 
@@ -23,6 +23,10 @@ class AddDocumentRequest(BaseModel):
     metadata: Optional[dict] = None
 
 
+class AddDocumentsRequest(BaseModel):
+    documents: List[AddDocumentRequest]
+
+
 class AnswerRequest(BaseModel):
     question: str
     context_docs: int = 3
@@ -37,9 +41,10 @@ async def query_documents(
     Query document index using semantic search
     Returns relevant documents
     """
-    results = embedding_service.search(
+    results = await embedding_service.asearch(
         query=request.query,
-        top_k=request.top_k
+        top_k=request.top_k,
+        query_embedding=await embedding_service.aencode_one(request.query)
     )
 
     return {
@@ -62,10 +67,11 @@ async def add_document(
 ):
     """
     Add document to vector index
+    Concurrent calls are coalesced into one encoder batch
     """
-    embedding_service.add_documents(
-        documents=[request.content],
-        metadata=[request.metadata] if request.metadata else None
+    await embedding_service.add_document_batched(
+        content=request.content,
+        metadata=request.metadata
     )
 
     return {
@@ -74,6 +80,26 @@ async def add_document(
     }
 
 
+@router.post("/add-documents")
+async def add_documents(
+    request: AddDocumentsRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Add documents to vector index in bulk
+    One encoder forward pass for the whole payload
+    """
+    await embedding_service.aadd_documents(
+        documents=[doc.content for doc in request.documents],
+        metadata=[doc.metadata or {} for doc in request.documents]
+    )
+
+    return {
+        "message": f"{len(request.documents)} documents added successfully",
+        "total_documents": len(embedding_service.documents)
+    }
+
+
 @router.post("/answer")
 async def answer_question(
     request: AnswerRequest,
@@ -84,10 +110,14 @@ async def answer_question(
     1. Retrieve relevant documents
     2. Generate answer with LLM
     """
-    # Retrieve relevant documents
-    results = embedding_service.search(
+    # Encode the question once (memoized) and reuse the vector for
+    # retrieval - repeated questions skip the encoder forward pass
+    q_vec = await embedding_service.aencode_one(request.question)
+
+    results = await embedding_service.asearch(
         query=request.question,
-        top_k=request.context_docs
+        top_k=request.context_docs,
+        query_embedding=q_vec
     )
 
     if not results:
@@ -100,8 +130,9 @@ async def answer_question(
     # Combine context
     context = "\n\n".join([doc for doc, _, _ in results])
 
-    # Generate answer with LLM
-    answer = llm_service.answer_question(
+    # Generate answer with LLM (off-loop: a TinyLlama decode takes
+    # seconds and would otherwise starve every other request)
+    answer = await llm_service.aanswer_question(
         question=request.question,
         context=context
     )
@@ -127,7 +158,7 @@ async def generate_query_plan(
     """
     Convert natural language query to structured query plan
     """
-    plan = llm_service.generate_query_plan(request.query)
+    plan = await llm_service.agenerate_query_plan(request.query)
 
     return {
         "query": request.query,
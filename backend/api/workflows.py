@@ -1,4 +1,6 @@
 """Workflow orchestration API"""
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -6,18 +8,91 @@ from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from datetime import datetime
 
-from backend.database import get_db
+from backend.database import get_db, AsyncSessionLocal
 from backend.models.user import User
 from backend.models.workflow import WorkflowExecution
-from backend.models.provider import Provider
+from backend.models.provider import Provider, geography_point
 from backend.api.auth import get_current_user
 from backend.agents.meta_agent import meta_agent
 from backend.integrations.npi import npi_client
 from backend.integrations.geocode import geocoder
 import json
+import orjson
+import logging
+import redis.asyncio as aioredis
+from backend.config import settings
 from backend.utils.security import compute_integrity_hash
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Live progress goes through Redis instead of per-step SQL commits; the
+# workflow row itself is only committed at terminal states
+_redis = None
+_redis_down = False
+
+
+def _get_progress_redis():
+    """Lazily connect to Redis; disable progress publishing on failure"""
+    global _redis, _redis_down
+
+    if _redis is None and not _redis_down:
+        try:
+            _redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"Redis unavailable for workflow progress: {e}")
+            _redis_down = True
+
+    return _redis
+
+
+async def _publish_progress(workflow_id: str, step: str, percentage: int):
+    """Publish live progress for the status endpoint (microsecond write)"""
+    global _redis_down
+
+    redis_client = _get_progress_redis()
+    if redis_client:
+        try:
+            await redis_client.set(
+                f"workflow:{workflow_id}:progress",
+                json.dumps({"current_step": step, "progress_percentage": percentage}),
+                ex=3600
+            )
+        except Exception as e:
+            logger.warning(f"Redis unavailable for workflow progress: {e}")
+            _redis_down = True
+
+
+async def _clear_progress(workflow_id: str):
+    """Drop the live-progress key once the workflow row is committed"""
+    global _redis_down
+
+    redis_client = _get_progress_redis()
+    if redis_client:
+        try:
+            await redis_client.delete(f"workflow:{workflow_id}:progress")
+        except Exception as e:
+            logger.warning(f"Redis unavailable for workflow progress: {e}")
+            _redis_down = True
+
+
+async def _get_live_progress(workflow_id: str) -> Optional[Dict[str, Any]]:
+    """Read live progress, if any, for a running workflow"""
+    global _redis_down
+
+    redis_client = _get_progress_redis()
+    if redis_client:
+        try:
+            raw = await redis_client.get(f"workflow:{workflow_id}:progress")
+        except Exception as e:
+            logger.warning(f"Redis unavailable for workflow progress: {e}")
+            _redis_down = True
+            return None
+
+        if raw:
+            return json.loads(raw)
+
+    return None
 
 
 class RunWorkflowRequest(BaseModel):
@@ -74,8 +149,6 @@ async def run_workflow(
 
 async def execute_workflow_task(workflow_id: str, npi_number: str):
     """Background task to execute workflow"""
-    from backend.database import AsyncSessionLocal
-
     async with AsyncSessionLocal() as db:
         try:
             # Get workflow
@@ -87,17 +160,57 @@ async def execute_workflow_task(workflow_id: str, npi_number: str):
             evidence = []
             steps_completed = []
 
+            # Look up any previously stored provider first - reused in
+            # the storage step, and its address lets geocoding start
+            # concurrently with the NPI fetch
+            result = await db.execute(
+                select(Provider).where(Provider.npi_number == npi_number)
+            )
+            provider = result.scalar_one_or_none()
+
             # Step 1: NPI Lookup
+            # Intermediate steps only flush - one commit (and one fsync)
+            # at the terminal state instead of four on the hot path
             workflow.current_step = "npi_lookup"
             workflow.progress_percentage = 20
-            await db.commit()
-
-            npi_data = await npi_client.lookup_npi(npi_number)
+            await db.flush()
+            await _publish_progress(workflow_id, "npi_lookup", 20)
+
+            # Speculatively geocode the known address while the NPI
+            # round-trip is in flight: wall-clock becomes max(t_npi,
+            # t_geo) instead of their sum on re-verification runs
+            npi_task = asyncio.create_task(npi_client.lookup_npi(npi_number))
+
+            known_address = None
+            geo_task = None
+            if provider and provider.address_line_1:
+                known_address = (
+                    provider.address_line_1,
+                    provider.city,
+                    provider.state,
+                    provider.postal_code
+                )
+                geo_task = asyncio.create_task(geocoder.geocode(
+                    address=provider.address_line_1,
+                    city=provider.city,
+                    state=provider.state,
+                    postal_code=provider.postal_code
+                ))
+
+            try:
+                npi_data = await npi_task
+            except Exception:
+                if geo_task:
+                    geo_task.cancel()
+                raise
 
             if not npi_data:
+                if geo_task:
+                    geo_task.cancel()
                 workflow.status = "failed"
                 workflow.error_message = "NPI not found"
                 await db.commit()
+                await _clear_progress(workflow_id)
                 return
 
             parsed = npi_client.parse_provider_data(npi_data)
@@ -116,17 +229,32 @@ async def execute_workflow_task(workflow_id: str, npi_number: str):
             workflow.current_step = "geocoding"
             workflow.progress_percentage = 40
             workflow.steps_completed = steps_completed
-            await db.commit()
+            await db.flush()
+            await _publish_progress(workflow_id, "geocoding", 40)
 
             coords = None
+            parsed_address = (
+                parsed.get("address_line_1"),
+                parsed.get("city"),
+                parsed.get("state"),
+                parsed.get("postal_code")
+            )
+
             if parsed.get("address_line_1"):
                 try:
-                    coords = await geocoder.geocode(
-                        address=parsed["address_line_1"],
-                        city=parsed.get("city"),
-                        state=parsed.get("state"),
-                        postal_code=parsed.get("postal_code")
-                    )
+                    if geo_task and parsed_address == known_address:
+                        # Registry address unchanged - the speculative
+                        # geocode already covers it
+                        coords = await geo_task
+                    else:
+                        if geo_task:
+                            geo_task.cancel()
+                        coords = await geocoder.geocode(
+                            address=parsed["address_line_1"],
+                            city=parsed.get("city"),
+                            state=parsed.get("state"),
+                            postal_code=parsed.get("postal_code")
+                        )
                     if coords:
                         parsed["latitude"] = coords[0]
                         parsed["longitude"] = coords[1]
@@ -146,22 +274,21 @@ async def execute_workflow_task(workflow_id: str, npi_number: str):
                         "source": "Nominatim (OpenStreetMap)",
                         "error": str(e)
                     })
+            elif geo_task:
+                geo_task.cancel()
 
             # Step 3: Store provider
             workflow.current_step = "storage"
             workflow.progress_percentage = 60
             workflow.steps_completed = steps_completed
-            await db.commit()
-
-            # Check if provider exists
-            result = await db.execute(
-                select(Provider).where(Provider.npi_number == npi_number)
-            )
-            provider = result.scalar_one_or_none()
+            await db.flush()
+            await _publish_progress(workflow_id, "storage", 60)
 
+            # Provider row was already fetched before step 1
             if not provider:
                 # Compute integrity hash
-                raw_json = json.dumps(parsed["raw_data"], sort_keys=True)
+                # orjson canonicalizes in C and hands bytes straight to the hash
+                raw_json = orjson.dumps(parsed["raw_data"], option=orjson.OPT_SORT_KEYS)
                 integrity_hash = compute_integrity_hash(raw_json)
 
                 provider = Provider(
@@ -186,9 +313,11 @@ async def execute_workflow_task(workflow_id: str, npi_number: str):
                     last_verified=datetime.utcnow()
                 )
 
+                if settings.POSTGIS_ENABLED and coords:
+                    provider.geom = geography_point(coords[0], coords[1])
+
                 db.add(provider)
-                await db.commit()
-                await db.refresh(provider)
+                await db.flush()
 
             steps_completed.append("storage")
             evidence.append({
@@ -213,12 +342,14 @@ async def execute_workflow_task(workflow_id: str, npi_number: str):
             }
             workflow.completed_at = datetime.utcnow()
             await db.commit()
+            await _clear_progress(workflow_id)
 
         except Exception as e:
             workflow.status = "failed"
             workflow.error_message = str(e)
             workflow.completed_at = datetime.utcnow()
             await db.commit()
+            await _clear_progress(workflow_id)
 
 
 @router.get("/{workflow_id}/status", response_model=WorkflowStatus)
@@ -236,11 +367,22 @@ async def get_workflow_status(
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
+    # Running workflows report progress via Redis since intermediate
+    # steps no longer commit the row
+    progress_percentage = workflow.progress_percentage
+    current_step = workflow.current_step
+
+    if workflow.status == "running":
+        live = await _get_live_progress(workflow_id)
+        if live:
+            progress_percentage = live["progress_percentage"]
+            current_step = live["current_step"]
+
     return WorkflowStatus(
         id=str(workflow.id),
         status=workflow.status,
-        progress_percentage=workflow.progress_percentage,
-        current_step=workflow.current_step,
+        progress_percentage=progress_percentage,
+        current_step=current_step,
         steps_completed=workflow.steps_completed or [],
         started_at=workflow.started_at.isoformat(),
         completed_at=workflow.completed_at.isoformat() if workflow.completed_at else None
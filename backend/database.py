@@ -7,17 +7,55 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Convert postgresql:// to postgresql+asyncpg://
+# Convert postgresql:// to postgresql+asyncpg:// (fully async driver)
 database_url = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
-# Create async engine
-engine = create_async_engine(
-    database_url,
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
-    echo=settings.ENVIRONMENT == "development",
-    pool_pre_ping=True,
-)
+# asyncpg-level hardening shared by both engine variants: bounded
+# connect/statement times, JIT off (hurts short OLTP statements), and
+# TCP keepalives so idle connections survive k8s/NAT timeouts
+_connect_args = {
+    "timeout": 10,
+    "command_timeout": 30,
+    "server_settings": {
+        "jit": "off",
+        "tcp_keepalives_idle": "30",
+    },
+}
+
+# Create async engine. Behind PgBouncer in transaction mode the server
+# already pools connections, so disable SQLAlchemy's own pool.
+if settings.DATABASE_BEHIND_PGBOUNCER:
+    engine = create_async_engine(
+        database_url,
+        poolclass=NullPool,
+        echo=settings.ENVIRONMENT == "development",
+        query_cache_size=2048,
+        # Transaction-mode PgBouncer cannot track prepared statements
+        connect_args={
+            **_connect_args,
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+        },
+    )
+else:
+    engine = create_async_engine(
+        database_url,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        echo=settings.ENVIRONMENT == "development",
+        pool_pre_ping=True,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        query_cache_size=2048,
+        # Large asyncpg PREPARE cache: the auth/user lookup runs on every
+        # request and should skip the planner after the first call.
+        # statement_cache_size is asyncpg's own per-connection cache
+        connect_args={
+            **_connect_args,
+            "prepared_statement_cache_size": 2048,
+            "statement_cache_size": 1024,
+        },
+    )
 
 # Session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -50,5 +88,24 @@ async def init_db():
     async with engine.begin() as conn:
         # Import all models to register them
         from backend.models import user, provider, agent, workflow, graph
+
+        from sqlalchemy import text
+
+        if settings.MEMORY_VECTOR_BACKEND == "pgvector":
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+
+        if settings.POSTGIS_ENABLED:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+
         await conn.run_sync(Base.metadata.create_all)
+
+        if settings.POSTGIS_ENABLED:
+            # Backfill geography points for rows created before PostGIS
+            # was enabled (or by non-geo code paths)
+            await conn.execute(text(
+                "UPDATE providers SET geom = "
+                "ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography "
+                "WHERE geom IS NULL AND latitude IS NOT NULL "
+                "AND longitude IS NOT NULL"
+            ))
     logger.info("Database tables created successfully")
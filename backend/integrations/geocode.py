@@ -5,10 +5,14 @@ Rate limit: 1 request/second per their usage policy
 """
 import httpx
 import asyncio
+import hashlib
+import orjson
 from typing import Optional, Tuple, Dict, Any
 from tenacity import retry, stop_after_attempt, wait_exponential
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+import redis.asyncio as aioredis
 import logging
-from datetime import datetime, timedelta
 
 from backend.config import settings
 
@@ -26,46 +30,101 @@ class NominatimGeocoder:
         self.base_url = settings.NOMINATIM_BASE_URL
         self.user_agent = settings.NOMINATIM_USER_AGENT
         self.rate_limit = settings.NOMINATIM_RATE_LIMIT_SECONDS
-        self.last_request_time = None
-        self.cache: Dict[str, tuple[Optional[Tuple[float, float]], datetime]] = {}
-        self.cache_ttl = timedelta(days=30)  # Coordinates don't change often
-
-    async def _rate_limit(self):
-        """
-        Implement rate limiting per Nominatim usage policy
-        Requirement: max 1 request per second
-        """
-        if self.last_request_time:
-            elapsed = (datetime.utcnow() - self.last_request_time).total_seconds()
-            if elapsed < self.rate_limit:
-                await asyncio.sleep(self.rate_limit - elapsed)
-
-        self.last_request_time = datetime.utcnow()
+        # Token bucket on loop time: enforces the 1 rps Nominatim policy
+        # correctly under concurrency, unlike the old shared-timestamp
+        # check that raced between coroutines
+        self._limiter = AsyncLimiter(1, self.rate_limit)
+        # Coordinates don't change often - 30 days in both tiers; the
+        # Redis tier shares hits across workers
+        self.cache_ttl_seconds = 30 * 24 * 3600
+        self.cache: TTLCache = TTLCache(maxsize=100_000, ttl=self.cache_ttl_seconds)
+        self._redis = None
+        self._redis_down = False
+        self._client: Optional[httpx.AsyncClient] = None
+        # Single-flight: concurrent geocodes of the same query share one
+        # in-flight request - bulk imports hit the same city/postal code
+        # repeatedly and shouldn't each burn a rate-limit slot
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared pooled client - keep-alive skips per-call TCP+TLS setup"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_connections=64, max_keepalive_connections=32
+                ),
+                headers={"User-Agent": self.user_agent},
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled client (called at app shutdown)"""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
 
     def _cache_key(self, address: str) -> str:
         """Generate cache key from address"""
-        return address.lower().strip()
-
-    def _get_cached(self, address: str) -> Optional[Tuple[float, float]]:
-        """Get cached coordinates if valid"""
+        normalized = address.lower().strip()
+        return hashlib.sha1(normalized.encode()).hexdigest()
+
+    def _get_redis(self):
+        """Lazily connect to Redis; disable the tier after a failure"""
+        if self._redis is None and not self._redis_down:
+            try:
+                self._redis = aioredis.from_url(
+                    settings.REDIS_URL, decode_responses=True
+                )
+            except Exception as e:
+                logger.warning(f"Redis unavailable for geocode cache: {e}")
+                self._redis_down = True
+
+        return self._redis
+
+    async def _get_cached(self, address: str) -> Optional[Tuple[float, float]]:
+        """Get cached coordinates if valid (in-process first, then Redis)"""
         key = self._cache_key(address)
+
         if key in self.cache:
-            coords, cached_at = self.cache[key]
-            if datetime.utcnow() - cached_at < self.cache_ttl:
-                logger.info(f"Geocoding cache hit for {address}")
+            logger.info(f"Geocoding cache hit for {address}")
+            return self.cache[key]
+
+        redis_client = self._get_redis()
+        if redis_client:
+            try:
+                raw = await redis_client.get(f"geo:{key}")
+            except Exception as e:
+                logger.warning(f"Redis unavailable for geocode cache: {e}")
+                self._redis_down = True
+                return None
+
+            if raw is not None:
+                logger.info(f"Geocoding Redis cache hit for {address}")
+                coords = orjson.loads(raw)
+                coords = tuple(coords) if coords else None
+                self.cache[key] = coords
                 return coords
 
         return None
 
-    def _set_cache(self, address: str, coords: Optional[Tuple[float, float]]):
-        """Cache coordinates"""
+    async def _set_cache(self, address: str, coords: Optional[Tuple[float, float]]):
+        """Write-through coordinates to both tiers"""
         key = self._cache_key(address)
-        self.cache[key] = (coords, datetime.utcnow())
+        self.cache[key] = coords
+
+        redis_client = self._get_redis()
+        if redis_client:
+            try:
+                await redis_client.set(
+                    f"geo:{key}",
+                    orjson.dumps(coords),
+                    ex=self.cache_ttl_seconds
+                )
+            except Exception as e:
+                logger.warning(f"Redis unavailable for geocode cache: {e}")
+                self._redis_down = True
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
     async def geocode(
         self,
         address: str,
@@ -94,12 +153,37 @@ class NominatimGeocoder:
         query = ", ".join(query_parts)
 
         # Check cache
-        cached = self._get_cached(query)
+        cached = await self._get_cached(query)
         if cached is not None:
             return cached
 
+        # Single-flight: piggyback on an identical in-flight query
+        key = self._cache_key(query)
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            coords = await self._fetch_geocode(query)
+            future.set_result(coords)
+            return coords
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved even with no waiters
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10)
+    )
+    async def _fetch_geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        """Resolve a query via Nominatim (rate limited + retried)"""
         # Rate limit
-        await self._rate_limit()
+        await self._limiter.acquire()
 
         # Make request
         url = f"{self.base_url}/search"
@@ -110,33 +194,29 @@ class NominatimGeocoder:
             "addressdetails": 1,
         }
 
-        headers = {
-            "User-Agent": self.user_agent
-        }
-
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(f"Geocoding: {query}")
-                response = await client.get(url, params=params, headers=headers)
-                response.raise_for_status()
+            client = self._get_client()
+            logger.info(f"Geocoding: {query}")
+            response = await client.get(url, params=params)
+            response.raise_for_status()
 
-                results = response.json()
+            results = orjson.loads(response.content)
 
-                if not results:
-                    logger.warning(f"No geocoding results for: {query}")
-                    self._set_cache(query, None)
-                    return None
+            if not results:
+                logger.warning(f"No geocoding results for: {query}")
+                await self._set_cache(query, None)
+                return None
 
-                result = results[0]
-                lat = float(result["lat"])
-                lon = float(result["lon"])
+            result = results[0]
+            lat = float(result["lat"])
+            lon = float(result["lon"])
 
-                logger.info(f"Geocoded {query} -> ({lat}, {lon})")
+            logger.info(f"Geocoded {query} -> ({lat}, {lon})")
 
-                # Cache result
-                self._set_cache(query, (lat, lon))
+            # Cache result
+            await self._set_cache(query, (lat, lon))
 
-                return (lat, lon)
+            return (lat, lon)
 
         except httpx.HTTPError as e:
             logger.error(f"HTTP error geocoding {query}: {e}")
@@ -153,7 +233,7 @@ class NominatimGeocoder:
         """
         Reverse geocode coordinates to address
         """
-        await self._rate_limit()
+        await self._limiter.acquire()
 
         url = f"{self.base_url}/reverse"
         params = {
@@ -163,20 +243,16 @@ class NominatimGeocoder:
             "addressdetails": 1,
         }
 
-        headers = {
-            "User-Agent": self.user_agent
-        }
-
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(f"Reverse geocoding: ({latitude}, {longitude})")
-                response = await client.get(url, params=params, headers=headers)
-                response.raise_for_status()
+            client = self._get_client()
+            logger.info(f"Reverse geocoding: ({latitude}, {longitude})")
+            response = await client.get(url, params=params)
+            response.raise_for_status()
 
-                result = response.json()
-                logger.info(f"Reverse geocoded ({latitude}, {longitude})")
+            result = orjson.loads(response.content)
+            logger.info(f"Reverse geocoded ({latitude}, {longitude})")
 
-                return result.get("address")
+            return result.get("address")
 
         except httpx.HTTPError as e:
             logger.error(f"HTTP error reverse geocoding: {e}")
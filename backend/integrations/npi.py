@@ -4,10 +4,14 @@ Uses free public CMS NPI Registry API: https://npiregistry.cms.hhs.gov/api/
 """
 import httpx
 import asyncio
-from typing import Optional, Dict, Any
+import orjson
+import zstandard
+from typing import Optional, Dict, Any, List
 from tenacity import retry, stop_after_attempt, wait_exponential
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+import redis.asyncio as aioredis
 import logging
-from datetime import datetime, timedelta
 
 from backend.config import settings
 
@@ -20,73 +24,191 @@ class NPIRegistryClient:
     def __init__(self):
         self.base_url = settings.NPI_REGISTRY_BASE_URL
         self.rate_limit = settings.NPI_RATE_LIMIT_SECONDS
-        self.last_request_time = None
-        self.cache: Dict[str, tuple[Dict[Any, Any], datetime]] = {}
-        self.cache_ttl = timedelta(hours=24)
-
-    async def _rate_limit(self):
-        """Implement rate limiting"""
-        if self.last_request_time:
-            elapsed = (datetime.utcnow() - self.last_request_time).total_seconds()
-            if elapsed < self.rate_limit:
-                await asyncio.sleep(self.rate_limit - elapsed)
-
-        self.last_request_time = datetime.utcnow()
-
-    def _get_cached(self, npi_number: str) -> Optional[Dict[Any, Any]]:
-        """Get cached result if valid"""
-        if npi_number in self.cache:
-            data, cached_at = self.cache[npi_number]
-            if datetime.utcnow() - cached_at < self.cache_ttl:
-                logger.info(f"Cache hit for NPI {npi_number}")
-                return data
+        # Token bucket on loop time: correct under concurrency, unlike
+        # the old shared-timestamp check that raced between coroutines
+        self._limiter = AsyncLimiter(1, self.rate_limit)
+        # Two-tier cache: bounded in-process TTLCache in front of a
+        # shared Redis tier, so workers reuse each other's lookups.
+        # Values are zstd-compressed orjson - NPI blobs carry bulky
+        # other_names/addresses/endpoints sections that compress 5-10x,
+        # so 100k cached entries stay in the tens of MB
+        self.cache_ttl_seconds = 24 * 3600
+        self.cache: TTLCache = TTLCache(maxsize=100_000, ttl=self.cache_ttl_seconds)
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._redis = None
+        self._redis_down = False
+        self._client: Optional[httpx.AsyncClient] = None
+        # Single-flight: concurrent lookups of the same NPI share one
+        # in-flight request instead of each burning a rate-limit slot
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Bounds fan-out of bulk imports (lookup_many)
+        self._bulk_semaphore = asyncio.Semaphore(16)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared pooled client - keep-alive skips per-call TCP+TLS setup"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(
+                    max_connections=64, max_keepalive_connections=32
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled client (called at app shutdown)"""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def _pack(self, data: Dict[Any, Any]) -> bytes:
+        """Serialize + compress a cache value"""
+        return self._compressor.compress(orjson.dumps(data))
+
+    def _unpack(self, blob: bytes) -> Dict[Any, Any]:
+        """Decompress a cache value (pre-compression entries pass through)"""
+        try:
+            return orjson.loads(self._decompressor.decompress(blob))
+        except zstandard.ZstdError:
+            return orjson.loads(blob)
+
+    def _get_redis(self):
+        """Lazily connect to Redis; disable the tier after a failure"""
+        if self._redis is None and not self._redis_down:
+            try:
+                # Binary values (compressed blobs) - no response decoding
+                self._redis = aioredis.from_url(
+                    settings.REDIS_URL, decode_responses=False
+                )
+            except Exception as e:
+                logger.warning(f"Redis unavailable for NPI cache: {e}")
+                self._redis_down = True
+
+        return self._redis
+
+    async def _get_cached(self, npi_number: str) -> Optional[Dict[Any, Any]]:
+        """Get cached result if valid (in-process first, then Redis)"""
+        blob = self.cache.get(npi_number)
+        if blob is not None:
+            logger.info(f"Cache hit for NPI {npi_number}")
+            return self._unpack(blob)
+
+        redis_client = self._get_redis()
+        if redis_client:
+            try:
+                raw = await redis_client.get(f"npi:{npi_number}")
+            except Exception as e:
+                logger.warning(f"Redis unavailable for NPI cache: {e}")
+                self._redis_down = True
+                return None
+
+            if raw:
+                logger.info(f"Redis cache hit for NPI {npi_number}")
+                self.cache[npi_number] = raw
+                return self._unpack(raw)
 
         return None
 
-    def _set_cache(self, npi_number: str, data: Dict[Any, Any]):
-        """Cache result"""
-        self.cache[npi_number] = (data, datetime.utcnow())
+    async def _set_cache(self, npi_number: str, data: Dict[Any, Any]):
+        """Write-through cache result to both tiers (compressed)"""
+        blob = self._pack(data)
+        self.cache[npi_number] = blob
+
+        redis_client = self._get_redis()
+        if redis_client:
+            try:
+                await redis_client.set(
+                    f"npi:{npi_number}",
+                    blob,
+                    ex=self.cache_ttl_seconds
+                )
+            except Exception as e:
+                logger.warning(f"Redis unavailable for NPI cache: {e}")
+                self._redis_down = True
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
     async def lookup_npi(self, npi_number: str) -> Optional[Dict[Any, Any]]:
         """
         Lookup provider by NPI number
         Free public API - no authentication required
         """
         # Check cache first
-        cached = self._get_cached(npi_number)
+        cached = await self._get_cached(npi_number)
         if cached:
             return cached
 
+        # Single-flight: piggyback on an identical in-flight lookup
+        pending = self._pending.get(npi_number)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending[npi_number] = future
+        try:
+            result = await self._fetch_npi(npi_number)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved even with no waiters
+            raise
+        finally:
+            self._pending.pop(npi_number, None)
+
+    async def lookup_many(
+        self, npi_numbers: List[str]
+    ) -> Dict[str, Optional[Dict[Any, Any]]]:
+        """
+        Lookup a batch of NPIs concurrently (bulk import path)
+        Deduplicates the batch and bounds fan-out; failed lookups map
+        to None instead of failing the whole batch
+        """
+        async def _one(number: str) -> Optional[Dict[Any, Any]]:
+            async with self._bulk_semaphore:
+                try:
+                    return await self.lookup_npi(number)
+                except Exception as e:
+                    logger.error(f"Bulk NPI lookup failed for {number}: {e}")
+                    return None
+
+        unique = list(dict.fromkeys(npi_numbers))
+        results = await asyncio.gather(*(_one(n) for n in unique))
+        return dict(zip(unique, results))
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10)
+    )
+    async def _fetch_npi(self, npi_number: str) -> Optional[Dict[Any, Any]]:
+        """Fetch an NPI record from the registry (rate limited + retried)"""
         # Rate limit
-        await self._rate_limit()
+        await self._limiter.acquire()
 
         # Make request
         url = f"{self.base_url}?number={npi_number}&version=2.1"
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(f"Fetching NPI data for {npi_number}")
-                response = await client.get(url)
-                response.raise_for_status()
+            client = self._get_client()
+            logger.info(f"Fetching NPI data for {npi_number}")
+            response = await client.get(url)
+            response.raise_for_status()
 
-                data = response.json()
+            # orjson is 3-5x faster than stdlib json on the large NPI
+            # result blobs httpx's .json() would route through
+            data = orjson.loads(response.content)
 
-                # Check if results found
-                if data.get("result_count", 0) == 0:
-                    logger.warning(f"No results found for NPI {npi_number}")
-                    return None
+            # Check if results found
+            if data.get("result_count", 0) == 0:
+                logger.warning(f"No results found for NPI {npi_number}")
+                return None
 
-                result = data["results"][0]
+            result = data["results"][0]
 
-                # Cache result
-                self._set_cache(npi_number, result)
+            # Cache result
+            await self._set_cache(npi_number, result)
 
-                logger.info(f"Successfully fetched NPI {npi_number}")
-                return result
+            logger.info(f"Successfully fetched NPI {npi_number}")
+            return result
 
         except httpx.HTTPError as e:
             logger.error(f"HTTP error fetching NPI {npi_number}: {e}")
@@ -2,11 +2,12 @@
 Healthcare AI Agentic System - Main FastAPI Application
 Free OSS stack: FastAPI + PostgreSQL + sentence-transformers + networkx
 """
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from prometheus_client import make_asgi_app
 import logging
 from pythonjsonlogger import jsonlogger
@@ -20,6 +21,15 @@ from backend.utils.logging_config import setup_logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# libuv-backed event loop: ~2x on network-heavy async workloads, which
+# covers every integration here. Set as policy so the loop is uvloop
+# even when the app is driven outside uvicorn (tests, scripts).
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -30,20 +40,45 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
 
-    # Initialize ML models
+    # Initialize and warm ML models so the first request doesn't pay
+    # multi-second weight loads and lazy kernel compilation
     from backend.ml.embeddings import embedding_service
     await embedding_service.initialize()
+    embedding_service.warm_up()
     logger.info("Embedding models loaded")
 
+    from backend.ml.llm import llm_service
+    await llm_service.initialize()
+    llm_service.warm_up()
+    logger.info("LLM loaded")
+
     # Initialize agent system
     from backend.agents.meta_agent import meta_agent
     await meta_agent.initialize()
     logger.info("Agent system initialized")
 
+    # Start batch workers
+    from backend.agents.memory_agent import memory_agent
+    await memory_agent.start_embedding_worker()
+    await embedding_service.start_batch_worker()
+    await embedding_service.start_persist_worker()
+
     yield
 
     # Cleanup
     logger.info("Shutting down gracefully")
+    await memory_agent.stop_embedding_worker()
+    await embedding_service.stop_batch_worker()
+    await embedding_service.stop_persist_worker()
+
+    from backend.integrations.npi import npi_client
+    from backend.integrations.geocode import geocoder
+    await npi_client.aclose()
+    await geocoder.aclose()
+
+    from backend.ml.executor import ml_executor
+    ml_executor.shutdown(wait=False)
+
     await engine.dispose()
 
 
@@ -52,7 +87,8 @@ app = FastAPI(
     title="Healthcare AI Agentic System",
     description="Production-grade healthcare provider verification with AI agents",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -98,7 +134,7 @@ app.include_router(rag.router, prefix="/rag", tags=["RAG & LLM"])
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
@@ -106,9 +142,14 @@ async def global_exception_handler(request, exc):
 
 if __name__ == "__main__":
     import uvicorn
+    development = settings.ENVIRONMENT == "development"
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.ENVIRONMENT == "development"
+        loop="uvloop",
+        http="httptools",
+        reload=development,
+        # reload and workers are mutually exclusive in uvicorn
+        workers=1 if development else (os.cpu_count() or 1)
     )
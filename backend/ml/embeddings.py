@@ -3,18 +3,43 @@ Embedding service using sentence-transformers (free OSS)
 Model: all-MiniLM-L6-v2 (384 dimensions, fast and efficient)
 """
 from sentence_transformers import SentenceTransformer
+import asyncio
+import torch
 import numpy as np
 import faiss
+import orjson
 import pickle
 import os
+from functools import lru_cache
 from typing import List, Tuple, Optional
 import logging
 from pathlib import Path
 
 from backend.config import settings
+from backend.ml.executor import run_in_ml_executor
 
 logger = logging.getLogger(__name__)
 
+# Optional ONNX Runtime backend for CPU encoding: an int8-quantized
+# MiniLM runs 3-5x faster than the PyTorch path on VNNI-capable Xeons.
+# Exported/quantized once via optimum, then served by onnxruntime.
+# Optional pyarrow: parses the documents.jsonl store in multithreaded
+# C++ instead of a per-line Python loop - matters at million-doc scale
+try:
+    import pyarrow.json as pa_json
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
 
 class EmbeddingService:
     """
@@ -25,19 +50,86 @@ class EmbeddingService:
     def __init__(self):
         self.model_name = settings.EMBEDDING_MODEL
         self.model: Optional[SentenceTransformer] = None
+        # ONNX Runtime session + tokenizer when the int8 CPU path is on
+        self._session = None
+        self._tokenizer = None
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.index: Optional[faiss.IndexFlatL2] = None
         self.index_path = Path(settings.FAISS_INDEX_PATH)
-        self.documents: List[str] = []
-        self.metadata: List[dict] = []
+        # Memory-map the on-disk index read-only so replica workers share
+        # pages through the OS cache instead of each holding a heap copy.
+        # Only for processes that never add (search-only replicas): a
+        # mmap'd index can't be appended to, so every write would force
+        # a full in-heap rebuild (see _append_vectors)
+        self.use_mmap = settings.FAISS_USE_MMAP
+        # SoA document store: parallel object-dtype arrays grown in
+        # power-of-two chunks (amortized append without list re-allocs)
+        # so search() can gather results via fancy indexing
+        self._doc_store = np.empty(0, dtype=object)
+        self._meta_store = np.empty(0, dtype=object)
+        self._size = 0
+        # Micro-batch single-document adds: concurrent requests coalesce
+        # into one encoder forward pass and one index/save cycle
+        self.max_batch = 64
+        self.max_wait_seconds = 0.1
+        self._add_queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        # Deferred persistence: adds mark the index dirty and a
+        # background task writes on a fixed cadence, so bulk ingest
+        # doesn't rewrite the whole index after every batch
+        self.persist_interval_seconds = 30.0
+        self._dirty = False
+        # Count of documents already appended to documents.jsonl
+        self._docs_synced = 0
+        # Set when the docs list shrank (remove/clear) and the JSONL
+        # must be rewritten rather than appended to
+        self._docs_rewrite = False
+        self._persist_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
-        """Load embedding model and FAISS index"""
-        logger.info(f"Loading embedding model: {self.model_name}")
+        """Load embedding model and FAISS index
+        Idempotent: a no-op when the model was already loaded, e.g.
+        pre-fork in the gunicorn master so workers share weights CoW"""
+        if self.model is not None or self._session is not None:
+            return
 
-        # Load sentence-transformers model (downloads if first time)
-        self.model = SentenceTransformer(self.model_name)
+        logger.info(f"Loading embedding model: {self.model_name}")
 
-        logger.info(f"Embedding model loaded. Dimension: {self.model.get_sentence_embedding_dimension()}")
+        if (
+            self.device == "cpu"
+            and ONNX_AVAILABLE
+            and settings.EMBEDDING_USE_ONNX
+        ):
+            try:
+                self._init_onnx()
+            except Exception as e:
+                logger.warning(
+                    f"ONNX embedding backend unavailable ({e}); "
+                    "falling back to PyTorch"
+                )
+
+        if self._session is None:
+            if self.device == "cpu":
+                # Half the cores for intra-op parallelism: with OMP
+                # defaulting to all cores, concurrent request handlers
+                # oversubscribe and thrash each other's threads
+                torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+                try:
+                    # One inter-op thread keeps the GIL + ML-executor
+                    # topology predictable
+                    torch.set_num_interop_threads(1)
+                except RuntimeError:
+                    pass  # pool already started; can't resize
+
+            # Load sentence-transformers model (downloads if first time)
+            self.model = SentenceTransformer(self.model_name, device=self.device)
+
+            # FP16 on GPU: halves bytes moved through the transformer for
+            # no measurable recall loss on MiniLM
+            if self.device == "cuda":
+                self.model = self.model.half()
+
+            logger.info(f"Embedding model loaded. Dimension: {self.model.get_sentence_embedding_dimension()}")
 
         # Create or load FAISS index
         self.index_path.parent.mkdir(parents=True, exist_ok=True)
@@ -49,57 +141,437 @@ class EmbeddingService:
 
         logger.info("Embedding service initialized")
 
+    def _init_onnx(self):
+        """
+        Export + int8-quantize the model once, then open an ORT session
+        Dynamic quantization (avx512_vnni config) keeps accuracy within
+        noise for MiniLM while using int8 dot-product instructions
+        """
+        onnx_dir = Path(settings.EMBEDDING_ONNX_PATH)
+        model_file = onnx_dir / "model_quantized.onnx"
+
+        if not model_file.exists():
+            logger.info("Exporting embedding model to int8 ONNX (one-time)")
+            onnx_dir.mkdir(parents=True, exist_ok=True)
+            exported = ORTModelForFeatureExtraction.from_pretrained(
+                self.model_name, export=True
+            )
+            exported.save_pretrained(onnx_dir)
+            quantizer = ORTQuantizer.from_pretrained(onnx_dir)
+            quantizer.quantize(
+                save_dir=onnx_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(
+                    is_static=False
+                ),
+            )
+
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._session = onnxruntime.InferenceSession(
+            str(model_file), providers=["CPUExecutionProvider"]
+        )
+        self._session_inputs = {i.name for i in self._session.get_inputs()}
+        logger.info(f"Embedding model loaded via ONNX Runtime from {onnx_dir}")
+
+    def _encode_onnx(self, texts: List[str]) -> np.ndarray:
+        """Tokenize, run the int8 session, mean-pool and L2-normalize"""
+        outputs = []
+        for start in range(0, len(texts), 128):
+            batch = texts[start:start + 128]
+            encoded = self._tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=256,
+                return_tensors="np",
+            )
+            inputs = {
+                name: value for name, value in encoded.items()
+                if name in self._session_inputs
+            }
+            hidden = self._session.run(None, inputs)[0]
+
+            # Mean pooling over non-padding tokens (matches the
+            # sentence-transformers pooling head for MiniLM)
+            mask = encoded["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(
+                mask.sum(axis=1), 1e-9
+            )
+            outputs.append(pooled)
+
+        embeddings = np.ascontiguousarray(
+            np.vstack(outputs).astype(np.float32, copy=False)
+        )
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    async def start_batch_worker(self):
+        """Start background task that coalesces queued document adds"""
+        if self._batch_task is None:
+            self._add_queue = asyncio.Queue()
+            self._batch_task = asyncio.create_task(self._batch_loop())
+            logger.info("Document batch worker started")
+
+    async def stop_batch_worker(self):
+        """Stop the background task and flush anything still queued"""
+        if self._batch_task:
+            self._batch_task.cancel()
+            try:
+                await self._batch_task
+            except asyncio.CancelledError:
+                pass
+            self._batch_task = None
+
+        if self._add_queue and not self._add_queue.empty():
+            batch = []
+            while not self._add_queue.empty():
+                batch.append(self._add_queue.get_nowait())
+            await self._flush_add_batch(batch)
+
+    async def start_persist_worker(self):
+        """Start background task that persists the index when dirty"""
+        if self._persist_task is None:
+            self._persist_task = asyncio.create_task(self._persist_loop())
+            logger.info("Index persist worker started")
+
+    async def stop_persist_worker(self):
+        """Stop the persist task and flush any unsaved state"""
+        if self._persist_task:
+            self._persist_task.cancel()
+            try:
+                await self._persist_task
+            except asyncio.CancelledError:
+                pass
+            self._persist_task = None
+
+        if self._dirty:
+            self._save_index()
+
+    async def _persist_loop(self):
+        """Write index + new documents every persist_interval_seconds"""
+        while True:
+            await asyncio.sleep(self.persist_interval_seconds)
+            if self._dirty:
+                self._save_index()
+
+    async def _batch_loop(self):
+        """Drain the queue, flushing every max_batch items or max_wait_seconds"""
+        while True:
+            batch = [await self._add_queue.get()]
+
+            while len(batch) < self.max_batch:
+                try:
+                    item = await asyncio.wait_for(
+                        self._add_queue.get(),
+                        timeout=self.max_wait_seconds
+                    )
+                    batch.append(item)
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush_add_batch(batch)
+            except Exception as e:
+                logger.error(f"Error flushing document batch: {e}")
+
+    async def _flush_add_batch(self, batch):
+        """Add a coalesced batch of documents in one encoder call
+        The encode runs on the ML executor so the flush doesn't stall
+        the event loop; futures resolve back on the loop thread"""
+        contents = [content for content, _, _ in batch]
+        metadata = [meta for _, meta, _ in batch]
+
+        try:
+            await run_in_ml_executor(
+                self.add_documents, documents=contents, metadata=metadata
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(True)
+
+    async def add_document_batched(self, content: str, metadata: Optional[dict] = None):
+        """
+        Add a single document through the micro-batcher
+        Waits until the batch containing it has been indexed
+        """
+        if self._add_queue is None:
+            # Worker not running - add inline
+            self.add_documents([content], [metadata or {}])
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        await self._add_queue.put((content, metadata or {}, future))
+        await future
+
+    @property
+    def documents(self) -> np.ndarray:
+        """View of the stored documents (no copy)"""
+        return self._doc_store[:self._size]
+
+    @property
+    def metadata(self) -> np.ndarray:
+        """View of the stored per-document metadata (no copy)"""
+        return self._meta_store[:self._size]
+
+    @staticmethod
+    def _to_object_array(items: List) -> np.ndarray:
+        arr = np.empty(len(items), dtype=object)
+        if len(items):
+            arr[:] = items
+        return arr
+
+    def _set_records(self, documents: List[str], metadata: List[dict]):
+        """Replace both stores outright (load/remove/clear paths)"""
+        self._doc_store = self._to_object_array(list(documents))
+        self._meta_store = self._to_object_array(list(metadata))
+        self._size = len(self._doc_store)
+
+    def _append_records(self, documents: List[str], metadata: List[dict]):
+        """Append records, doubling capacity when the stores are full"""
+        needed = self._size + len(documents)
+        if needed > len(self._doc_store):
+            capacity = max(1024, 1 << (needed - 1).bit_length())
+            for attr in ("_doc_store", "_meta_store"):
+                store = np.empty(capacity, dtype=object)
+                store[:self._size] = getattr(self, attr)[:self._size]
+                setattr(self, attr, store)
+
+        self._doc_store[self._size:needed] = documents
+        self._meta_store[self._size:needed] = metadata
+        self._size = needed
+
     def _index_exists(self) -> bool:
         """Check if saved index exists"""
-        return (
-            (self.index_path / "index.faiss").exists() and
+        return (self.index_path / "index.faiss").exists() and (
+            (self.index_path / "documents.jsonl").exists() or
             (self.index_path / "documents.pkl").exists()
         )
 
+    def _new_index(self, dimension: int) -> faiss.Index:
+        """
+        Build an empty index for the given dimension
+        FAISS_INDEX_TYPE picks the structure: "hnsw" and "ivfpq" trade a
+        little recall for sublinear search instead of the flat O(N*d)
+        scan; with FAISS_QUANTIZE_INT8 the flat vectors are stored 8-bit
+        scalar quantized - 4x less memory/bandwidth
+        All variants use inner product over L2-normalized vectors, i.e.
+        cosine similarity - what MiniLM is trained for
+        """
+        if settings.FAISS_INDEX_TYPE == "hnsw":
+            index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+            index.hnsw.efSearch = 64
+            return index
+
+        if settings.FAISS_INDEX_TYPE == "ivfpq":
+            quantizer = faiss.IndexFlatIP(dimension)
+            return faiss.IndexIVFPQ(
+                quantizer, dimension, settings.FAISS_IVF_NLIST, 16, 8,
+                faiss.METRIC_INNER_PRODUCT
+            )
+
+        if settings.FAISS_QUANTIZE_INT8:
+            return faiss.IndexScalarQuantizer(
+                dimension,
+                faiss.ScalarQuantizer.QT_8bit,
+                faiss.METRIC_INNER_PRODUCT
+            )
+        return faiss.IndexFlatIP(dimension)
+
     def _create_index(self):
         """Create new FAISS index"""
-        dimension = self.model.get_sentence_embedding_dimension()
-        self.index = faiss.IndexFlatL2(dimension)
-        self.documents = []
-        self.metadata = []
+        if self.model is not None:
+            dimension = self.model.get_sentence_embedding_dimension()
+        else:
+            dimension = settings.EMBEDDING_DIM
+        self.index = self._new_index(dimension)
+        self._set_records([], [])
+        self._docs_synced = 0
+        self._docs_rewrite = True
         logger.info(f"Created new FAISS index with dimension {dimension}")
 
     def _load_index(self):
         """Load existing FAISS index"""
         try:
-            self.index = faiss.read_index(str(self.index_path / "index.faiss"))
-
-            with open(self.index_path / "documents.pkl", "rb") as f:
-                data = pickle.load(f)
-                self.documents = data["documents"]
-                self.metadata = data["metadata"]
+            if self.use_mmap:
+                self.index = faiss.read_index(
+                    str(self.index_path / "index.faiss"),
+                    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+            else:
+                self.index = faiss.read_index(str(self.index_path / "index.faiss"))
+
+            docs_file = self.index_path / "documents.jsonl"
+            if docs_file.exists():
+                self._set_records(*self._read_documents(docs_file))
+            else:
+                # Legacy pickle store; converted to JSONL on next save
+                with open(self.index_path / "documents.pkl", "rb") as f:
+                    data = pickle.load(f)
+                    self._set_records(data["documents"], data["metadata"])
+                self._docs_rewrite = True
+
+            self._docs_synced = len(self.documents)
 
             logger.info(f"Loaded FAISS index with {len(self.documents)} documents")
         except Exception as e:
             logger.error(f"Error loading index: {e}")
             self._create_index()
 
+    @staticmethod
+    def _read_documents(docs_file: Path) -> Tuple[List[str], List[dict]]:
+        """Parse the JSONL docs store
+        Prefers pyarrow's multithreaded C++ JSON reader; falls back to a
+        per-line orjson loop (always used for empty/odd files)"""
+        if PYARROW_AVAILABLE and docs_file.stat().st_size > 0:
+            try:
+                table = pa_json.read_json(str(docs_file))
+                return (
+                    table.column("document").to_pylist(),
+                    table.column("metadata").to_pylist(),
+                )
+            except Exception as e:
+                logger.warning(f"pyarrow parse of docs store failed: {e}")
+
+        documents: List[str] = []
+        metadata: List[dict] = []
+        with open(docs_file, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = orjson.loads(line)
+                documents.append(record["document"])
+                metadata.append(record["metadata"])
+        return documents, metadata
+
     def _save_index(self):
-        """Save FAISS index to disk"""
+        """Save FAISS index to disk (atomic write + rename for readers)"""
         try:
             self.index_path.mkdir(parents=True, exist_ok=True)
 
-            faiss.write_index(self.index, str(self.index_path / "index.faiss"))
+            index_file = self.index_path / "index.faiss"
+            tmp_index = self.index_path / "index.faiss.tmp"
+
+            faiss.write_index(self.index, str(tmp_index))
+            os.replace(tmp_index, index_file)
 
-            with open(self.index_path / "documents.pkl", "wb") as f:
-                pickle.dump({
-                    "documents": self.documents,
-                    "metadata": self.metadata
-                }, f)
+            self._persist_documents()
 
+            if self.use_mmap:
+                # Swap back to the freshly written file, memory-mapped
+                self.index = faiss.read_index(
+                    str(index_file),
+                    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+
+            self._dirty = False
             logger.info("FAISS index saved")
         except Exception as e:
             logger.error(f"Error saving index: {e}")
 
+    def _persist_documents(self):
+        """
+        Sync the documents.jsonl store
+        Append-only on the normal ingest path: only records past
+        _docs_synced are written, so each insert costs O(1) bytes rather
+        than re-pickling the whole corpus. Shrinks (remove/clear) and
+        legacy pickle migration rewrite the file atomically
+        """
+        docs_file = self.index_path / "documents.jsonl"
+
+        if self._docs_rewrite:
+            tmp_docs = self.index_path / "documents.jsonl.tmp"
+            with open(tmp_docs, "wb") as f:
+                for doc, meta in zip(self.documents, self.metadata):
+                    f.write(orjson.dumps(
+                        {"document": doc, "metadata": meta}
+                    ) + b"\n")
+            os.replace(tmp_docs, docs_file)
+            self._docs_rewrite = False
+        elif self._docs_synced < len(self.documents):
+            with open(docs_file, "ab") as f:
+                for doc, meta in zip(
+                    self.documents[self._docs_synced:],
+                    self.metadata[self._docs_synced:]
+                ):
+                    f.write(orjson.dumps(
+                        {"document": doc, "metadata": meta}
+                    ) + b"\n")
+
+        self._docs_synced = len(self.documents)
+
+    def warm_up(self):
+        """Run one tiny encode so tokenizer/model lazy init happens at
+        startup, not on the first user request"""
+        if self.model or self._session:
+            self.encode(["warm up"])
+            logger.info("Embedding model warmed up")
+
     def encode(self, texts: List[str]) -> np.ndarray:
-        """Encode texts to embeddings"""
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings
+        """Encode texts to unit-norm float32 embeddings"""
+        # Dedup within the batch: encode each distinct text once and
+        # scatter the rows back (bulk ingest repeats boilerplate often)
+        if len(texts) > 1:
+            unique = list(dict.fromkeys(texts))
+            if len(unique) < len(texts):
+                unique_embeddings = self.encode(unique)
+                position = {text: i for i, text in enumerate(unique)}
+                return unique_embeddings[[position[t] for t in texts]]
+
+        if self._session is not None:
+            return self._encode_onnx(texts)
+
+        # inference_mode drops autograd bookkeeping entirely (cheaper
+        # than no_grad: no version counters on the activations)
+        with torch.inference_mode():
+            embeddings = self.model.encode(
+                texts,
+                batch_size=128,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        return embeddings.astype(np.float32, copy=False)
+
+    async def aencode(self, texts: List[str]) -> np.ndarray:
+        """encode() off the event loop, on the shared ML executor"""
+        return await run_in_ml_executor(self.encode, texts)
+
+    async def aencode_one(self, text: str) -> np.ndarray:
+        """encode_one() off the event loop (cache hits stay cheap)"""
+        return await run_in_ml_executor(self.encode_one, text)
+
+    async def asearch(
+        self,
+        query: str,
+        top_k: int = 5,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float, dict]]:
+        """search() off the event loop"""
+        return await run_in_ml_executor(
+            self.search, query, top_k=top_k, query_embedding=query_embedding
+        )
+
+    async def aadd_documents(
+        self, documents: List[str], metadata: Optional[List[dict]] = None
+    ):
+        """add_documents() off the event loop (bulk ingest path)"""
+        await run_in_ml_executor(self.add_documents, documents, metadata)
+
+    @lru_cache(maxsize=10_000)
+    def encode_one(self, text: str) -> np.ndarray:
+        """
+        Encode a single text, memoized
+        Repeated questions skip the model forward pass entirely; callers
+        can also pass the result to search() to avoid re-encoding
+        """
+        return self.encode([text])
 
     def add_documents(self, documents: List[str], metadata: Optional[List[dict]] = None):
         """
@@ -108,54 +580,139 @@ class EmbeddingService:
         if not documents:
             return
 
-        # Encode documents
-        embeddings = self.encode(documents)
+        # encode() already returns unit-norm float32; no extra copy
+        embeddings = np.ascontiguousarray(self.encode(documents))
 
         # Add to FAISS
-        self.index.add(embeddings.astype('float32'))
+        self._append_vectors(embeddings)
 
         # Store documents and metadata
-        self.documents.extend(documents)
-
-        if metadata:
-            self.metadata.extend(metadata)
-        else:
-            self.metadata.extend([{}] * len(documents))
+        self._append_records(
+            documents,
+            metadata if metadata else [{} for _ in documents]
+        )
 
-        # Save index
-        self._save_index()
+        # Defer persistence to the background worker: synchronous
+        # write_index here made bulk ingest O(N^2) bytes written
+        self._dirty = True
 
         logger.info(f"Added {len(documents)} documents to index. Total: {len(self.documents)}")
 
     def search(
         self,
         query: str,
-        top_k: int = 5
+        top_k: int = 5,
+        query_embedding: Optional[np.ndarray] = None
     ) -> List[Tuple[str, float, dict]]:
         """
         Search for similar documents
-        Returns list of (document, distance, metadata)
+        Accepts a precomputed query embedding to skip re-encoding
+        Returns list of (document, cosine similarity, metadata)
         """
         if len(self.documents) == 0:
             return []
 
-        # Encode query
-        query_embedding = self.encode([query])
+        # Encode query unless the caller already did
+        if query_embedding is None:
+            query_embedding = self.encode([query])
+
+        # Search FAISS (cosine similarity - higher is closer); normalize
+        # defensively in case the caller's vector didn't come via encode()
+        query_vec = np.ascontiguousarray(query_embedding.astype(np.float32, copy=False))
+        faiss.normalize_L2(query_vec)
+        scores, indices = self.index.search(query_vec, top_k)
+
+        # Gather results via fancy indexing over the SoA stores instead
+        # of a Python bounds-checked loop (FAISS pads misses with -1)
+        idx = indices[0]
+        valid = (idx >= 0) & (idx < self._size)
+        idx = idx[valid]
+
+        return list(zip(
+            self.documents[idx].tolist(),
+            scores[0][valid].tolist(),
+            self.metadata[idx].tolist()
+        ))
+
+    def _append_vectors(self, vectors: np.ndarray):
+        """
+        Append vectors to the index
+        A read-only mmap index cannot be added to, so rebuild in-heap from
+        reconstructed vectors; _save_index swaps back to the mmap'd file.
+        That rebuild is O(corpus) per write (full HNSW reconstruction for
+        the default index type), which is why mmap is reserved for
+        search-only replicas and defaults off
+        """
+        if self.use_mmap:
+            logger.warning(
+                "Adding to a mmap'd FAISS index forces a full rebuild; "
+                "disable FAISS_USE_MMAP on writing processes"
+            )
+            new_index = self._new_index(self.index.d)
+
+            if self.index.ntotal > 0:
+                combined = np.vstack([
+                    self._reconstruct_all(),
+                    vectors
+                ])
+            else:
+                combined = vectors
+
+            # Scalar/product quantizers calibrate from the data
+            if not new_index.is_trained:
+                new_index.train(combined)
+
+            new_index.add(combined)
+            self.index = new_index
+        else:
+            if not self.index.is_trained:
+                self.index.train(vectors)
+            self.index.add(vectors)
 
-        # Search FAISS
-        distances, indices = self.index.search(query_embedding.astype('float32'), top_k)
+    def _reconstruct_all(self) -> np.ndarray:
+        """Pull all stored vectors back out of the index"""
+        # IVF indexes need a direct map before reconstruct_n works
+        if isinstance(self.index, faiss.IndexIVF):
+            self.index.make_direct_map()
 
-        # Collect results
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.documents):
-                results.append((
-                    self.documents[idx],
-                    float(dist),
-                    self.metadata[idx]
-                ))
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def remove(self, memory_ids: List[str]):
+        """
+        Remove documents whose metadata memory_id is in memory_ids
+        Rebuilds the flat index from reconstructed vectors (no re-encoding)
+        """
+        if not memory_ids or len(self.documents) == 0:
+            return
+
+        id_set = set(memory_ids)
+        keep = [
+            i for i, meta in enumerate(self.metadata)
+            if meta.get("memory_id") not in id_set
+        ]
+
+        if len(keep) == len(self.documents):
+            return
+
+        # Reconstruct stored vectors so we don't pay encoding again
+        vectors = self._reconstruct_all()
+
+        kept_documents = self.documents[keep]
+        kept_metadata = self.metadata[keep]
+
+        self._create_index()
+
+        if keep:
+            kept_vectors = vectors[keep].astype('float32')
+            if not self.index.is_trained:
+                self.index.train(kept_vectors)
+            self.index.add(kept_vectors)
+
+        self._set_records(kept_documents.tolist(), kept_metadata.tolist())
+
+        self._save_index()
 
-        return results
+        logger.info(f"Removed {len(id_set)} documents from index. Total: {len(self.documents)}")
 
     def clear_index(self):
         """Clear all documents from index"""
@@ -0,0 +1,27 @@
+"""
+Shared bounded executor for CPU-bound ML work
+generate/encode are synchronous and would otherwise block the event
+loop from inside async handlers; two workers keep them off the loop
+without oversubscribing torch's own intra-op thread pool
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+ml_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ml")
+
+
+async def run_in_ml_executor(func, *args, **kwargs):
+    """Run a blocking ML call on the shared executor
+
+    Goes through loop.run_in_executor directly rather than
+    asyncio.to_thread, which would copy_context() per call - nothing
+    here reads contextvars. The partial is only built when keyword
+    arguments force it; positional calls pass straight through.
+    """
+    loop = asyncio.get_running_loop()
+    if kwargs:
+        return await loop.run_in_executor(
+            ml_executor, functools.partial(func, *args, **kwargs)
+        )
+    return await loop.run_in_executor(ml_executor, func, *args)
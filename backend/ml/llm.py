@@ -3,15 +3,34 @@ LLM service using free open-source models
 Uses TinyLlama for fast inference without GPU requirements
 For production, can swap with larger models like Mistral-7B or Llama-2-7B
 """
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
+import asyncio
+import os
 from typing import Optional, List, Dict
 import logging
 
 from backend.config import settings
+from backend.ml.executor import run_in_ml_executor
 
 logger = logging.getLogger(__name__)
 
+# Optional int4 backends. llama.cpp serves a pre-converted GGUF on CPU
+# (quantized weights cut decode memory traffic 4-8x vs FP32);
+# bitsandbytes provides nf4 quantization for the GPU transformers path.
+try:
+    from llama_cpp import Llama
+    LLAMA_CPP_AVAILABLE = True
+except ImportError:
+    LLAMA_CPP_AVAILABLE = False
+
+try:
+    import bitsandbytes  # noqa: F401
+    from transformers import BitsAndBytesConfig
+    BNB_AVAILABLE = True
+except ImportError:
+    BNB_AVAILABLE = False
+
 
 class LLMService:
     """
@@ -23,40 +42,73 @@ class LLMService:
         self.model_name = settings.LLM_MODEL
         self.tokenizer: Optional[AutoTokenizer] = None
         self.model: Optional[AutoModelForCausalLM] = None
-        self.pipe = None
+        # llama.cpp handle when serving a quantized GGUF on CPU
+        self.llm = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Single-flight: identical concurrent generations share one
+        # decode instead of each paying a full TinyLlama pass
+        self._inflight: Dict[tuple, asyncio.Future] = {}
 
     async def initialize(self):
-        """Load LLM model"""
+        """Load LLM model
+        Idempotent: a no-op when a backend was already loaded, e.g.
+        pre-fork in the gunicorn master so workers share weights CoW"""
+        if self.llm is not None or self.model is not None:
+            return
+
         logger.info(f"Loading LLM model: {self.model_name} on {self.device}")
 
         try:
+            # Preferred CPU path: int4 GGUF via llama.cpp. TinyLlama at
+            # FP32 is ~4.4GB and bandwidth-bound at decode; Q4_K_M cuts
+            # weight bytes ~8x and roughly doubles tok/s
+            if (
+                self.device == "cpu"
+                and LLAMA_CPP_AVAILABLE
+                and os.path.exists(settings.LLM_GGUF_PATH)
+            ):
+                self.llm = Llama(
+                    model_path=settings.LLM_GGUF_PATH,
+                    n_ctx=settings.LLM_CONTEXT_LENGTH,
+                    n_threads=os.cpu_count(),
+                    verbose=False,
+                )
+                logger.info(
+                    f"LLM loaded via llama.cpp from {settings.LLM_GGUF_PATH}"
+                )
+                return
+
             # Load tokenizer
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
 
             # Load model with appropriate settings for CPU/GPU
             if self.device == "cpu":
-                # CPU optimization
+                # CPU fallback without llama.cpp/GGUF
                 self.model = AutoModelForCausalLM.from_pretrained(
                     self.model_name,
                     torch_dtype=torch.float32,
                     low_cpu_mem_usage=True
                 )
+            elif BNB_AVAILABLE:
+                # GPU: nf4 weights, bf16 compute
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    self.model_name,
+                    quantization_config=BitsAndBytesConfig(
+                        load_in_4bit=True,
+                        bnb_4bit_compute_dtype=torch.bfloat16,
+                        bnb_4bit_quant_type="nf4",
+                    ),
+                    device_map="auto"
+                )
             else:
-                # GPU optimization
+                # GPU without bitsandbytes
                 self.model = AutoModelForCausalLM.from_pretrained(
                     self.model_name,
                     torch_dtype=torch.float16,
                     device_map="auto"
                 )
 
-            # Create pipeline
-            self.pipe = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device=0 if self.device == "cuda" else -1
-            )
+            self.model.eval()
 
             logger.info("LLM model loaded successfully")
 
@@ -64,6 +116,13 @@ class LLMService:
             logger.warning(f"Could not load LLM model: {e}. LLM features will be limited.")
             # Graceful degradation - system can still work without LLM
 
+    def warm_up(self):
+        """Run one tiny generation so kernel compilation and weight
+        paging happen at startup, not on the first user request"""
+        if self.llm or self.model:
+            self.generate("Hello", max_length=20)
+            logger.info("LLM warmed up")
+
     def generate(
         self,
         prompt: str,
@@ -75,7 +134,7 @@ class LLMService:
         """
         Generate text completion
         """
-        if not self.pipe:
+        if self.llm is None and self.model is None:
             return "LLM not available. Please initialize the model."
 
         try:
@@ -85,39 +144,102 @@ class LLMService:
             else:
                 formatted_prompt = prompt
 
-            # Generate
-            result = self.pipe(
-                formatted_prompt,
-                max_length=max_length,
-                temperature=temperature,
-                top_p=top_p,
-                do_sample=True,
-                num_return_sequences=1,
-                **kwargs
-            )
-
-            generated_text = result[0]["generated_text"]
+            # llama.cpp path (quantized GGUF on CPU)
+            if self.llm is not None:
+                result = self.llm(
+                    formatted_prompt,
+                    max_tokens=max_length,
+                    temperature=temperature,
+                    top_p=top_p,
+                    **kwargs
+                )
+                return result["choices"][0]["text"].strip()
+
+            # Direct generate: the pipeline wrapper re-tokenized and
+            # rebuilt sampling config on every call. max_new_tokens
+            # budgets output only, so long RAG contexts aren't counted
+            inputs = self.tokenizer(
+                formatted_prompt, return_tensors="pt"
+            ).to(self.device)
+
+            do_sample = temperature > 0
+            gen_kwargs = {
+                "max_new_tokens": max_length,
+                "do_sample": do_sample,
+                "use_cache": True,
+                "pad_token_id": self.tokenizer.eos_token_id,
+                **kwargs,
+            }
+            if do_sample:
+                gen_kwargs["temperature"] = temperature
+                gen_kwargs["top_p"] = top_p
 
-            # Extract just the response (remove prompt)
-            if formatted_prompt in generated_text:
-                generated_text = generated_text.replace(formatted_prompt, "").strip()
+            with torch.inference_mode():
+                output = self.model.generate(**inputs, **gen_kwargs)
 
-            return generated_text
+            # Decode only the newly generated tokens - no prompt echo
+            # to strip back out
+            return self.tokenizer.decode(
+                output[0, inputs["input_ids"].shape[1]:],
+                skip_special_tokens=True
+            ).strip()
 
         except Exception as e:
             logger.error(f"Error generating text: {e}")
             return f"Error: {str(e)}"
 
-    def answer_question(
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """
+        generate() off the event loop, on the shared ML executor
+        Identical in-flight calls (same prompt + sampling params)
+        coalesce onto one decode
+        """
+        key = (
+            prompt,
+            kwargs.get("max_length", 200),
+            kwargs.get("temperature", 0.7),
+            kwargs.get("top_p", 0.9),
+        )
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await run_in_ml_executor(self.generate, prompt, **kwargs)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved even with no waiters
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def aanswer_question(
         self,
         question: str,
         context: str,
         max_length: int = 150
     ) -> str:
-        """
-        Answer question given context (RAG pattern)
-        """
-        prompt = f"""Based on the following context, answer the question concisely.
+        """answer_question() off the event loop, with coalescing"""
+        return await self.agenerate(
+            self._qa_prompt(question, context),
+            max_length=max_length,
+            temperature=0.3
+        )
+
+    async def agenerate_query_plan(self, natural_language_query: str) -> Dict:
+        """generate_query_plan() off the event loop"""
+        return await run_in_ml_executor(
+            self.generate_query_plan, natural_language_query
+        )
+
+    @staticmethod
+    def _qa_prompt(question: str, context: str) -> str:
+        """RAG answer prompt, shared by the sync and async paths"""
+        return f"""Based on the following context, answer the question concisely.
 
 Context: {context}
 
@@ -125,7 +247,20 @@ Question: {question}
 
 Answer:"""
 
-        return self.generate(prompt, max_length=max_length, temperature=0.3)
+    def answer_question(
+        self,
+        question: str,
+        context: str,
+        max_length: int = 150
+    ) -> str:
+        """
+        Answer question given context (RAG pattern)
+        """
+        return self.generate(
+            self._qa_prompt(question, context),
+            max_length=max_length,
+            temperature=0.3
+        )
 
     def extract_entities(self, text: str) -> Dict[str, List[str]]:
         """
@@ -142,7 +277,7 @@ Text: {text}
 
 Entities:"""
 
-        if self.pipe:
+        if self.llm or self.model:
             result = self.generate(prompt, max_length=200, temperature=0.1)
             # Parse result (simplified)
             return {"extracted": result}
@@ -165,7 +300,7 @@ Return a JSON-like structure with:
 
 Plan:"""
 
-        if self.pipe:
+        if self.llm or self.model:
             result = self.generate(prompt, max_length=250, temperature=0.2)
             return {"plan": result}
         else:
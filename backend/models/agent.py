@@ -0,0 +1,89 @@
+"""Agent models - runs, memories, and feedback signals"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Float, Integer, DateTime, JSON, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from pgvector.sqlalchemy import Vector
+
+from backend.config import settings
+from backend.database import Base
+
+
+class AgentRun(Base):
+    """A single agent task execution, optionally nested under a parent run"""
+    __tablename__ = "agent_runs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    agent_type = Column(String(50), nullable=False, index=True)
+    task_description = Column(Text)
+    input_data = Column(JSON)
+    output_data = Column(JSON)
+    status = Column(String(20), default="pending", index=True)
+    parent_run_id = Column(String(36), index=True)
+    user_id = Column(String(36))
+    error_message = Column(Text)
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    duration_seconds = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AgentMemory(Base):
+    """Episodic/semantic memory entry, mirrored into FAISS for search"""
+    __tablename__ = "agent_memory"
+
+    # Composite indexes for the hot query paths:
+    # - get_recent_memories: agent_type filter + created_at ordering
+    # - get_important_memories: agent_type filter + importance ordering
+    # - prune_memories: partial index covering the prune predicate
+    __table_args__ = (
+        Index("ix_mem_agent_created", "agent_type", "created_at"),
+        Index("ix_mem_agent_importance", "agent_type", "importance_score"),
+        Index(
+            "ix_mem_prune",
+            "created_at",
+            postgresql_where=text("importance_score < 0.3 AND access_count < 1")
+        ),
+    ) + ((
+        # ANN search happens in the same table when pgvector is enabled
+        Index(
+            "ix_mem_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"}
+        ),
+    ) if settings.MEMORY_VECTOR_BACKEND == "pgvector" else ())
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    memory_type = Column(String(20), default="episodic")
+    content = Column(Text, nullable=False)
+    content_encrypted = Column(Text)
+    # Encrypted first-128-chars preview so listing endpoints don't pay a
+    # full-blob decrypt just to show a snippet
+    content_preview_encrypted = Column(Text)
+    agent_type = Column(String(50), default="meta")
+    related_run_id = Column(String(36))
+    tags = Column(JSON, default=list)
+    importance_score = Column(Float, default=0.5)
+    embedding_stored = Column(String(20))
+    access_count = Column(Integer, default=0)
+
+    if settings.MEMORY_VECTOR_BACKEND == "pgvector":
+        embedding = Column(Vector(settings.EMBEDDING_DIM))
+
+    last_accessed = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class FeedbackSignal(Base):
+    """Human feedback attached to an agent run"""
+    __tablename__ = "feedback_signals"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    run_id = Column(String(36), nullable=False, index=True)
+    agent_type = Column(String(50))
+    feedback_type = Column(String(20), nullable=False)
+    feedback_value = Column(Float, nullable=False)
+    feedback_text = Column(Text)
+    user_id = Column(String(36))
+    created_at = Column(DateTime, default=datetime.utcnow)
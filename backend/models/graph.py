@@ -0,0 +1,19 @@
+"""Graph models - edges between providers for trust computation"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+
+from backend.database import Base
+
+
+class ProviderEdge(Base):
+    """Directed weighted edge between two providers"""
+    __tablename__ = "provider_edges"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    source_provider_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    target_provider_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    edge_type = Column(String(50), nullable=False)
+    weight = Column(Float, nullable=False, default=1.0)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,71 @@
+"""Provider models - NPI registry records and trust scores"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Float, Integer, DateTime, JSON, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+
+from backend.config import settings
+from backend.database import Base
+
+if settings.POSTGIS_ENABLED:
+    from geoalchemy2 import Geography
+
+
+class Provider(Base):
+    """Healthcare provider verified against the CMS NPI registry"""
+    __tablename__ = "providers"
+
+    __table_args__ = ((
+        # Index-backed ST_DWithin radius search when PostGIS is enabled
+        Index("ix_provider_geom", "geom", postgresql_using="gist"),
+    ) if settings.POSTGIS_ENABLED else ())
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    npi_number = Column(String(10), unique=True, nullable=False, index=True)
+    first_name = Column(String(100))
+    last_name = Column(String(100))
+    organization_name = Column(String(255))
+    taxonomy_code = Column(String(20), index=True)
+    taxonomy_description = Column(String(255))
+    address_line_1 = Column(String(255))
+    address_line_2 = Column(String(255))
+    city = Column(String(100))
+    state = Column(String(2))
+    postal_code = Column(String(10))
+    country = Column(String(2), default="US")
+    phone = Column(String(20))
+    fax = Column(String(20))
+    latitude = Column(Float)
+    longitude = Column(Float)
+
+    if settings.POSTGIS_ENABLED:
+        geom = Column(Geography(geometry_type="POINT", srid=4326))
+
+    raw_data = Column(JSON)
+    # Hex digest with a short version prefix (e.g. "v2:")
+    integrity_hash = Column(String(72))
+    last_verified = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+def geography_point(latitude: float, longitude: float) -> str:
+    """EWKT point literal for the geom column"""
+    return f"SRID=4326;POINT({longitude} {latitude})"
+
+
+class ProviderTrustScore(Base):
+    """TrustRank score computed over the provider graph"""
+    __tablename__ = "provider_trust_scores"
+
+    # Descending index so the top-providers ORDER BY ... LIMIT never
+    # sorts the whole table
+    __table_args__ = (
+        Index("ix_pts_trust_score_desc", text("trust_score DESC")),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    provider_id = Column(UUID(as_uuid=True), nullable=False, unique=True, index=True)
+    trust_score = Column(Float, nullable=False, default=0.0)
+    rank = Column(Integer)
+    connection_count = Column(Integer, default=0)
+    computed_at = Column(DateTime, default=datetime.utcnow)
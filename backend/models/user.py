@@ -0,0 +1,25 @@
+"""User model - accounts with JWT auth and optional TOTP 2FA"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+
+from backend.database import Base
+
+
+class User(Base):
+    """Application user account"""
+    __tablename__ = "users"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    username = Column(String(100), unique=True, nullable=False, index=True)
+    email = Column(String(255), unique=True, nullable=False, index=True)
+    # Versioned hash string: "v2" peppered argon2id, bare argon2id or
+    # legacy bcrypt (see backend.utils.security)
+    hashed_password = Column(String(255), nullable=False)
+    totp_secret = Column(String(64))
+    totp_enabled = Column(Boolean, default=False)
+    role = Column(String(20), default="user")
+    is_active = Column(Boolean, default=True)
+    is_verified = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,26 @@
+"""Workflow models - end-to-end verification workflow executions"""
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Integer, DateTime, JSON
+from sqlalchemy.dialects.postgresql import UUID
+
+from backend.database import Base
+
+
+class WorkflowExecution(Base):
+    """One run of a verification workflow, updated as steps complete"""
+    __tablename__ = "workflow_executions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    workflow_type = Column(String(50), nullable=False, index=True)
+    input_params = Column(JSON)
+    status = Column(String(20), default="pending", index=True)
+    current_step = Column(String(50))
+    progress_percentage = Column(Integer, default=0)
+    steps_completed = Column(JSON)
+    evidence = Column(JSON)
+    results = Column(JSON)
+    error_message = Column(Text)
+    user_id = Column(String(36))
+    started_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime)
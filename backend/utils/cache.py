@@ -0,0 +1,68 @@
+"""Shared Redis cache helpers
+Lazily connects once per process and degrades to cache misses when Redis
+is unreachable, so callers never block on a dead cache tier
+"""
+import logging
+import redis.asyncio as aioredis
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+_redis_down = False
+
+
+def get_redis():
+    """Lazily connected shared client; None once Redis proved unreachable"""
+    global _redis, _redis_down
+
+    if _redis is None and not _redis_down:
+        try:
+            _redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as e:
+            logger.warning(f"Redis unavailable: {e}")
+            _redis_down = True
+
+    return _redis
+
+
+async def cache_get(key: str):
+    """Get a key, treating any Redis failure as a miss"""
+    global _redis_down
+
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            return await redis_client.get(key)
+        except Exception as e:
+            logger.warning(f"Redis unavailable: {e}")
+            _redis_down = True
+
+    return None
+
+
+async def cache_set(key: str, value, ttl: int = None):
+    """Set a key, ignoring Redis failures"""
+    global _redis_down
+
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            await redis_client.set(key, value, ex=ttl)
+        except Exception as e:
+            logger.warning(f"Redis unavailable: {e}")
+            _redis_down = True
+
+
+async def cache_delete(key: str):
+    """Delete a key, ignoring Redis failures"""
+    global _redis_down
+
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            await redis_client.delete(key)
+        except Exception as e:
+            logger.warning(f"Redis unavailable: {e}")
+            _redis_down = True
@@ -1,130 +1,378 @@
 """Security utilities - JWT, password hashing, 2FA, encryption"""
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
+from datetime import timedelta
+from functools import lru_cache
+from typing import Optional, Union
+import asyncio
+import jwt
+from cachetools import TTLCache
 from passlib.context import CryptContext
-import pyotp
-import qrcode
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, InvalidHashError
 from io import BytesIO
 import base64
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
+import binascii
 import hashlib
+import hmac
+import orjson
 import os
+import threading
+import time
 
 from backend.config import settings
 
-# Password hashing
+# Password hashing - argon2id for new hashes, bcrypt kept for legacy ones
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
+
+
+# New hashes are argon2id over an HMAC-SHA256 pre-hash keyed with the
+# server-side pepper ("v2" prefix on the stored string): a dumped
+# users table alone is no longer crackable offline, and the fixed-size
+# digest sidesteps any scheme input limit (bcrypt truncated at 72
+# bytes). The pre-hash is a single SHA-256 - free next to argon2.
+_PEPPERED_PREFIX = "v2"
+
+
+def _prehash(password: str) -> str:
+    return base64.b64encode(
+        hmac.new(settings.PASSWORD_PEPPER.encode(), password.encode(), hashlib.sha256).digest()
+    ).decode()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
+    """Verify password against hash (peppered argon2id, legacy argon2id
+    or legacy bcrypt)"""
+    if hashed_password.startswith(_PEPPERED_PREFIX + "$argon2"):
+        try:
+            return password_hasher.verify(
+                hashed_password[len(_PEPPERED_PREFIX):], _prehash(plain_password)
+            )
+        except (VerifyMismatchError, InvalidHashError):
+            return False
+
+    if hashed_password.startswith("$argon2"):
+        try:
+            return password_hasher.verify(hashed_password, plain_password)
+        except (VerifyMismatchError, InvalidHashError):
+            return False
+
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Hash password"""
-    return pwd_context.hash(password)
+    """Hash password with argon2id over the peppered pre-hash"""
+    return _PEPPERED_PREFIX + password_hasher.hash(_prehash(password))
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password off the event loop
+    argon2id at production parameters burns tens of milliseconds of
+    CPU; run from an async handler it would stall every other request
+    for that long. argon2-cffi and bcrypt both release the GIL, so
+    concurrent logins actually overlap on the default executor."""
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    """get_password_hash off the event loop (see averify_password)"""
+    return await asyncio.to_thread(get_password_hash, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True for legacy bcrypt/unpeppered hashes or stale argon2 params"""
+    if not hashed_password.startswith(_PEPPERED_PREFIX + "$argon2"):
+        return True
+    return password_hasher.check_needs_rehash(hashed_password[len(_PEPPERED_PREFIX):])
+
+
+# JWT tokens. For HS256 (the configured default) the codec is inlined:
+# orjson for the JSON segments and hashlib's OpenSSL-backed HMAC for
+# the signature, skipping PyJWT's generic header/option machinery on
+# the per-request path. Any other algorithm falls through to PyJWT.
+def _b64url_encode(raw: bytes) -> bytes:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+_JWT_KEY = settings.JWT_SECRET_KEY.encode()
+_JWT_HEADER_B64 = _b64url_encode(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
 
 
-# JWT tokens
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
+    # exp is an integer epoch per RFC 7519; plain time.time() math
+    # skips the datetime allocation and timedelta arithmetic entirely
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        ttl = int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        ttl = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    to_encode["exp"] = int(time.time()) + ttl
+
+    if settings.JWT_ALGORITHM != "HS256":
+        return jwt.encode(
+            to_encode,
+            settings.JWT_SECRET_KEY,
+            algorithm=settings.JWT_ALGORITHM
+        )
+
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url_encode(orjson.dumps(to_encode))
+    signature = hmac.new(_JWT_KEY, signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + _b64url_encode(signature)).decode()
 
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.JWT_SECRET_KEY,
-        algorithm=settings.JWT_ALGORITHM
-    )
-    return encoded_jwt
+
+# Successful decodes, keyed on the raw token. The token authenticates
+# its own payload, so replaying the cached claims is safe; the short
+# TTL bounds how long an entry can outlive its exp claim.
+_DECODE_CACHE = TTLCache(maxsize=10_000, ttl=60)
 
 
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decode and verify JWT token"""
-    try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        return payload
-    except JWTError:
+    """Decode and verify JWT token
+    Structurally invalid tokens (wrong segment count, absurd length)
+    are rejected before any base64 or HMAC work - garbage tokens under
+    credential stuffing otherwise pay the full SHA-256 pass. Repeat
+    presentations of a valid token hit the decode cache instead."""
+    if not token or token.count(".") != 2 or len(token) > 4096:
         return None
 
-
-# TOTP 2FA
+    cached = _DECODE_CACHE.get(token)
+    if cached is not None:
+        return cached
+
+    if settings.JWT_ALGORITHM != "HS256":
+        try:
+            payload = jwt.decode(
+                token,
+                settings.JWT_SECRET_KEY,
+                algorithms=[settings.JWT_ALGORITHM]
+            )
+        except jwt.InvalidTokenError:
+            return None
+    else:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        signing_input = (header_b64 + "." + payload_b64).encode()
+        expected = hmac.new(_JWT_KEY, signing_input, hashlib.sha256).digest()
+        try:
+            # Signature is checked against our own HMAC regardless of
+            # what the header claims, so alg-confusion doesn't apply
+            if not hmac.compare_digest(expected, _b64url_decode(signature_b64)):
+                return None
+            payload = orjson.loads(_b64url_decode(payload_b64))
+        except ValueError:
+            return None
+        exp = payload.get("exp")
+        if exp is not None and exp < time.time():
+            return None
+
+    _DECODE_CACHE[token] = payload
+    return payload
+
+
+# TOTP 2FA. pyotp (and segno below) are imported lazily inside the
+# functions: only the 2FA endpoints need them, and deferring keeps
+# worker cold-start and script/test imports of this module cheap.
+# sys.modules makes repeat calls effectively free.
 def generate_totp_secret() -> str:
     """Generate random TOTP secret"""
+    import pyotp
     return pyotp.random_base32()
 
 
+@lru_cache(maxsize=4096)
+def _totp_for(secret: str) -> "pyotp.TOTP":
+    """Memoized TOTP instance per secret
+    pyotp.TOTP base32-decodes the secret on construction; secrets are
+    long-lived and few per user, so caching the instance skips that
+    on every 2FA challenge"""
+    import pyotp
+    return pyotp.TOTP(secret)
+
+
+# Accepted codes, keyed (secret fingerprint, code), kept for the life
+# of the ±1 verification window. A code that already logged someone in
+# is rejected on replay without re-running the HMAC. Per-process only;
+# multi-worker deployments would need a Redis SET NX EX equivalent.
+_USED_CODES: dict = {}
+_USED_CODES_LOCK = threading.Lock()
+_REPLAY_TTL = 90.0
+
+
 def verify_totp(secret: str, token: str) -> bool:
-    """Verify TOTP token"""
-    totp = pyotp.TOTP(secret)
-    return totp.verify(token, valid_window=1)
+    """Verify TOTP token (±1 window, constant time, replay-proof)
+    Every window slot is checked unconditionally and codes are compared
+    with hmac.compare_digest, so timing reveals neither which slot
+    matched nor how many digits were right. A successfully used code is
+    remembered for 90s and refused on reuse - a dict lookup instead of
+    three HMACs, and it closes the replay window TOTP otherwise leaves
+    open."""
+    totp = _totp_for(secret)
+    # Normalize to the zero-padded 6-digit form to avoid length leakage
+    token = token.strip().zfill(6)
+
+    now = time.time()
+    replay_key = (hashlib.sha256(secret.encode()).hexdigest()[:16], token)
+    with _USED_CODES_LOCK:
+        for key, used_at in list(_USED_CODES.items()):
+            if now - used_at > _REPLAY_TTL:
+                del _USED_CODES[key]
+        if replay_key in _USED_CODES:
+            return False
+
+    timecode = int(now) // totp.interval
+    ok = False
+    for offset in (-1, 0, 1):
+        code = totp.at((timecode + offset) * totp.interval)
+        ok |= hmac.compare_digest(code, token)
+
+    if ok:
+        with _USED_CODES_LOCK:
+            _USED_CODES[replay_key] = now
+
+    return ok
 
 
 def get_totp_uri(secret: str, username: str, issuer: str = "Healthcare AI") -> str:
     """Get TOTP provisioning URI for QR code"""
-    totp = pyotp.TOTP(secret)
-    return totp.provisioning_uri(name=username, issuer_name=issuer)
+    return _totp_for(secret).provisioning_uri(name=username, issuer_name=issuer)
+
+
+# Media type of generate_qr_code output, for data-URI rendering
+QR_MEDIA_TYPE = "image/svg+xml"
 
 
+@lru_cache(maxsize=256)
 def generate_qr_code(uri: str) -> str:
-    """Generate QR code image as base64"""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(uri)
-    qr.make(fit=True)
+    """Generate QR code image as base64 (SVG)
+    segno writes SVG paths directly - no Pillow pixel buffer and no PNG
+    compression pass - and its encoder is markedly faster than qrcode's.
+    Memoized: encoding is deterministic and CPU-bound, and the URI for
+    a given (secret, username) never changes. The cache necessarily
+    retains provisioning URIs (which embed secrets) in-process - the
+    same lifetime the secrets already have in the ORM/session layer"""
+    import segno
 
-    img = qr.make_image(fill_color="black", back_color="white")
     buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    buffer.seek(0)
-
+    segno.make(uri, error="m").save(buffer, kind="svg", scale=5)
     return base64.b64encode(buffer.getvalue()).decode()
 
 
-# AES-256 Encryption for sensitive data
+# Encryption primitives built once at import from the key settings
+# already derived and validated (ENCRYPTION_KEY_B64); Fernet splits
+# into signing + encryption keys at construction, so reusing one
+# instance skips that per-use
+_ENCRYPTION_KEY = base64.urlsafe_b64decode(settings.ENCRYPTION_KEY_B64)
+_CIPHER = Fernet(settings.ENCRYPTION_KEY_B64)
+_AESGCM = AESGCM(_ENCRYPTION_KEY)
+
+# Prefix marking AES-GCM ciphertexts; unprefixed values are legacy
+# Fernet tokens
+_GCM_PREFIX = "v2:"
+
+
 class EncryptionService:
-    """AES-256 encryption for memory blobs and sensitive data"""
+    """AES-256-GCM encryption for memory blobs and sensitive data
+    GCM authenticates in the same AES-NI/PCLMULQDQ pass instead of
+    Fernet's CBC-then-HMAC double pass; legacy Fernet ciphertexts
+    still decrypt"""
 
     def __init__(self):
-        # Derive key from settings
-        key = settings.ENCRYPTION_KEY.encode()
-        if len(key) < 32:
-            key = key.ljust(32, b'0')
-        elif len(key) > 32:
-            key = key[:32]
-
-        self.cipher = Fernet(base64.urlsafe_b64encode(key))
+        self.cipher = _CIPHER  # legacy decryption only
 
     def encrypt(self, plaintext: str) -> str:
-        """Encrypt plaintext to base64"""
-        return self.cipher.encrypt(plaintext.encode()).decode()
+        """Encrypt plaintext to base64 (12-byte nonce || ciphertext+tag)"""
+        nonce = os.urandom(12)
+        ct = _AESGCM.encrypt(nonce, plaintext.encode(), None)
+        return _GCM_PREFIX + base64.b64encode(nonce + ct).decode()
 
     def decrypt(self, ciphertext: str) -> str:
-        """Decrypt from base64"""
+        """Decrypt from base64 (AES-GCM, or legacy Fernet)"""
+        if ciphertext.startswith(_GCM_PREFIX):
+            raw = base64.b64decode(ciphertext[len(_GCM_PREFIX):])
+            return _AESGCM.decrypt(raw[:12], raw[12:], None).decode()
+
         return self.cipher.decrypt(ciphertext.encode()).decode()
 
+    def decrypt_many(self, ciphertexts: list) -> list:
+        """
+        Decrypt a batch
+        Returns None for entries that fail to decrypt
+        The AES-GCM path is inlined with the cipher, prefix length and
+        base64 decoder hoisted out of the loop: bulk memory retrievals
+        were paying method dispatch and prefix routing per blob, which
+        masks AES-NI throughput. binascii.a2b_base64 skips the
+        validation wrapper base64.b64decode adds.
+        """
+        aes = _AESGCM
+        a2b = binascii.a2b_base64
+        prefix_len = len(_GCM_PREFIX)
+        results = []
+        for ciphertext in ciphertexts:
+            try:
+                if ciphertext.startswith(_GCM_PREFIX):
+                    raw = a2b(ciphertext[prefix_len:])
+                    results.append(aes.decrypt(raw[:12], raw[12:], None).decode())
+                else:
+                    results.append(self.cipher.decrypt(ciphertext.encode()).decode())
+            except Exception:
+                results.append(None)
+        return results
+
 
 encryption_service = EncryptionService()
 
 
-# SHA3-256 for integrity hashing
-def compute_integrity_hash(data: str) -> str:
-    """Compute SHA3-256 hash for integrity verification"""
-    return hashlib.sha3_256(data.encode()).hexdigest()
+# Integrity hashing, versioned by prefix: "v3:" BLAKE3 when the
+# optional blake3 wheel is installed (tree-hashed - SIMD lanes and
+# threads scale with input size, so multi-MB blobs hash at memory
+# bandwidth), "v2:" SHA-256 otherwise (SHA-NI on x86, which SHA3
+# lacks). Legacy unprefixed SHA3-256 hashes still verify.
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+
+def _blake3_hex(data: bytes) -> str:
+    return blake3.blake3(data, max_threads=blake3.blake3.AUTO).hexdigest()
 
 
-def verify_integrity_hash(data: str, expected_hash: str) -> bool:
-    """Verify integrity hash"""
-    computed = compute_integrity_hash(data)
-    return computed == expected_hash
+def compute_integrity_hash(data: Union[str, bytes]) -> str:
+    """Compute integrity hash (versioned BLAKE3 or SHA-256)
+    Accepts bytes directly so C-serialized payloads skip a re-encode"""
+    if isinstance(data, str):
+        data = data.encode()
+    if BLAKE3_AVAILABLE:
+        return "v3:" + _blake3_hex(data)
+    return "v2:" + hashlib.sha256(data).hexdigest()
+
+
+def verify_integrity_hash(data: Union[str, bytes], expected_hash: str) -> bool:
+    """Verify integrity hash (BLAKE3, SHA-256 or legacy SHA3-256)"""
+    if isinstance(data, str):
+        data = data.encode()
+
+    if expected_hash.startswith("v3:"):
+        if not BLAKE3_AVAILABLE:
+            return False
+        computed = "v3:" + _blake3_hex(data)
+    elif expected_hash.startswith("v2:"):
+        computed = "v2:" + hashlib.sha256(data).hexdigest()
+    else:
+        computed = hashlib.sha3_256(data).hexdigest()
+
+    # Constant-time: == short-circuits at the first differing byte,
+    # leaking how much of the digest matched
+    return hmac.compare_digest(computed, expected_hash)
@@ -0,0 +1,43 @@
+"""
+Gunicorn configuration for multi-worker production deployments
+
+Loads the app and the ML model weights once in the master process
+before forking, so every worker shares the read-only tensors through
+copy-on-write pages instead of each holding a private ~4GB copy of
+TinyLlama plus the embedding model.
+
+Note on the FAISS memory backend: each worker holds its own in-heap
+index and persists it independently, so concurrent workers that *add*
+documents overwrite each other's index.faiss/documents.jsonl
+last-writer-wins. Multi-worker deployments that ingest should use
+MEMORY_VECTOR_BACKEND=pgvector (shared writes in Postgres) or dedicate
+a single writer process; FAISS_USE_MMAP is for the search-only
+replicas in such a split.
+"""
+import multiprocessing
+
+bind = "0.0.0.0:8000"
+workers = multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def on_starting(server):
+    """Load model weights in the master, pre-fork (CPU only)
+
+    Skipped when CUDA is available: a CUDA context must not be
+    initialized before fork, and GPU weights aren't CoW-shareable
+    anyway. Each service's initialize() is idempotent, so the per-worker
+    lifespan startup becomes a no-op for anything loaded here.
+    """
+    import asyncio
+    import torch
+
+    if torch.cuda.is_available():
+        return
+
+    from backend.ml.embeddings import embedding_service
+    from backend.ml.llm import llm_service
+
+    asyncio.run(embedding_service.initialize())
+    asyncio.run(llm_service.initialize())
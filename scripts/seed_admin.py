@@ -8,8 +8,19 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+# Seed users are dev-only: use cheap argon2 parameters so repeated
+# seeding and test setup don't pay the production hashing cost. Must be
+# set before backend.utils.security is imported (the hasher is built at
+# import from settings); real env vars still win via setdefault, and
+# the login path rehashes at production parameters on first use.
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "8192")
+os.environ.setdefault("ARGON2_PARALLELISM", "1")
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from backend.models.user import User
 from backend.utils.security import get_password_hash, generate_totp_secret, get_totp_uri
 from backend.config import settings
@@ -19,67 +30,65 @@ import pyotp
 async def seed_admin():
     """Create admin user with TOTP"""
 
-    # Create async engine
+    # One-shot script: no echo (it stringifies every statement through
+    # logging) and no pool to warm up or dispose
     database_url = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
-    engine = create_async_engine(database_url, echo=True)
-
-    AsyncSessionLocal = async_sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False
-    )
-
-    async with AsyncSessionLocal() as session:
-        # Check if admin exists
-        result = await session.execute(
-            select(User).where(User.username == "admin")
+    engine = create_async_engine(database_url, echo=False, poolclass=NullPool)
+
+    totp_secret = generate_totp_secret()
+
+    async with engine.begin() as conn:
+        # Single round-trip upsert via Core: INSERT ... ON CONFLICT DO
+        # NOTHING RETURNING collapses the existence check and insert
+        result = await conn.execute(
+            pg_insert(User)
+            .values(
+                username="admin",
+                email="admin@healthcare-ai.local",
+                hashed_password=get_password_hash("admin123"),  # Change in production!
+                totp_secret=totp_secret,
+                totp_enabled=True,
+                role="admin",
+                is_active=True,
+                is_verified=True,
+            )
+            .on_conflict_do_nothing(index_elements=["username"])
+            .returning(User.id)
         )
-        existing_admin = result.scalar_one_or_none()
+        inserted = result.first()
+
+        if inserted is None:
+            # Admin already exists - fetch it for the summary printout
+            existing = (await conn.execute(
+                select(User.username, User.email, User.totp_secret)
+                .where(User.username == "admin")
+            )).first()
 
-        if existing_admin:
             print("✓ Admin user already exists")
-            print(f"  Username: {existing_admin.username}")
-            print(f"  Email: {existing_admin.email}")
+            print(f"  Username: {existing.username}")
+            print(f"  Email: {existing.email}")
 
-            if existing_admin.totp_secret:
-                uri = get_totp_uri(existing_admin.totp_secret, existing_admin.username)
+            if existing.totp_secret:
+                uri = get_totp_uri(existing.totp_secret, existing.username)
                 print(f"\n  TOTP URI: {uri}")
-                print(f"  TOTP Secret: {existing_admin.totp_secret}")
+                print(f"  TOTP Secret: {existing.totp_secret}")
 
+            await engine.dispose()
             return
 
-        # Generate TOTP secret
-        totp_secret = generate_totp_secret()
-
-        # Create admin user
-        admin = User(
-            username="admin",
-            email="admin@healthcare-ai.local",
-            hashed_password=get_password_hash("admin123"),  # Change in production!
-            totp_secret=totp_secret,
-            totp_enabled=True,
-            role="admin",
-            is_active=True,
-            is_verified=True
-        )
-
-        session.add(admin)
-        await session.commit()
-        await session.refresh(admin)
-
-        # Generate TOTP URI for QR code
-        uri = get_totp_uri(totp_secret, admin.username)
-
-        print("✓ Admin user created successfully!")
-        print(f"\n  Username: {admin.username}")
-        print(f"  Password: admin123  (CHANGE THIS IN PRODUCTION!)")
-        print(f"  Email: {admin.email}")
-        print(f"  Role: {admin.role}")
-        print(f"\n  TOTP 2FA Enabled")
-        print(f"  TOTP Secret: {totp_secret}")
-        print(f"  TOTP URI (scan with authenticator app):")
-        print(f"  {uri}")
-        print(f"\n  Current TOTP token: {pyotp.TOTP(totp_secret).now()}")
+    # Generate TOTP URI for QR code
+    uri = get_totp_uri(totp_secret, "admin")
+
+    print("✓ Admin user created successfully!")
+    print(f"\n  Username: admin")
+    print(f"  Password: admin123  (CHANGE THIS IN PRODUCTION!)")
+    print(f"  Email: admin@healthcare-ai.local")
+    print(f"  Role: admin")
+    print(f"\n  TOTP 2FA Enabled")
+    print(f"  TOTP Secret: {totp_secret}")
+    print(f"  TOTP URI (scan with authenticator app):")
+    print(f"  {uri}")
+    print(f"\n  Current TOTP token: {pyotp.TOTP(totp_secret).now()}")
 
     await engine.dispose()
 